@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Measures finding the largest bookmark of pages of records not sorted by their replication key.
+
+Compares taking the max of a list of each page's raw values, as the tap used to, with BookmarkTracker, which takes
+the max of each page without building a list and compares the largest with the running bookmark by date-time.
+
+USAGE:
+    python -m benchmarks.bench_bookmarks --page-size 10000 --pages 100
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from benchmarks.bench_sync import make_record
+from tap_nikabot.bookmarks import BookmarkTracker
+
+Page = List[Dict[str, Any]]
+
+
+def list_max(pages: List[Page], column: str) -> Any:
+    bookmark = None
+    for page in pages:
+        page_max = max([row[column] for row in page])
+        bookmark = max(bookmark, page_max) if bookmark else page_max
+    return bookmark
+
+
+def tracker_max(pages: List[Page], column: str) -> Any:
+    tracker = BookmarkTracker()
+    for page in pages:
+        page_tracker = BookmarkTracker()
+        page_tracker.update_rows(page, column)
+        tracker.merge(page_tracker)
+    return tracker.value
+
+
+def run(name: str, find_max: Callable[[List[Page], str], Any], pages: List[Page], column: str) -> None:
+    rows = sum(len(page) for page in pages)
+    start = time.perf_counter()
+    bookmark = find_max(pages, column)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {column:<11} rows/sec: {rows / elapsed:>12,.0f} bookmark: {bookmark}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=10000)
+    parser.add_argument("--pages", type=int, default=100)
+    args = parser.parse_args()
+
+    pages = [[make_record(p * args.page_size + i) for i in range(args.page_size)] for p in range(args.pages)]
+    # Records have many dates but a unique created_at, every third formatted with a UTC suffix as the API does for
+    # some records
+    for p, page in enumerate(pages):
+        for i, row in enumerate(page):
+            created_at = datetime(2020, 1, 1) + timedelta(seconds=p * args.page_size + i, milliseconds=i % 1000)
+            row["created_at"] = created_at.isoformat(timespec="milliseconds")
+            if i % 3 == 0:
+                row["created_at"] = row["created_at"][:19] + "Z"
+    for column in ("date", "created_at"):
+        run("list max", list_max, pages, column)
+        run("tracker", tracker_max, pages, column)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Measures end to end syncs of each stream against a local stand-in for the Nikabot API.
+
+Unlike bench_sync this exercises the whole client: HTTP requests, paging, decoding, transforming and writing. Each
+scenario runs in a fresh process so its peak RSS is its own.
+
+USAGE:
+    python -m benchmarks.bench_http
+    python -m benchmarks.bench_http --scenario records-multi-year --latency-ms 50
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from datetime import date
+from multiprocessing.connection import Connection
+from typing import Any, Dict, Tuple
+from unittest.mock import patch
+
+from benchmarks.bench_sync import RECORD_SCHEMA, make_catalog
+from benchmarks.stub_server import Dataset, StubServer
+from tap_nikabot import sync
+
+USER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "created_at": {"type": "string", "format": "date-time"},
+        "deleted": {"type": "boolean"},
+        "groups": {"type": "array", "items": {"type": "string"}},
+        "id": {"type": "string"},
+        "is_admin": {"type": "boolean"},
+        "name": {"type": "string"},
+        "presence": {"type": "string"},
+        "team_id": {"type": "string"},
+        "tz": {"type": "string"},
+        "tz_offset": {"type": "integer", "format": "int32"},
+        "updated_at": {"type": "string", "format": "date-time"},
+        "user_id": {"type": "string"},
+    },
+}
+PROJECT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "author": {"type": "string"},
+        "created_at": {"type": "string", "format": "date-time"},
+        "groups": {"type": "array", "items": {"type": "string"}},
+        "id": {"type": "string"},
+        "project_name": {"type": "string"},
+        "team_id": {"type": "string"},
+    },
+}
+GROUP_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "string"},
+        "members": {"type": "array", "items": {"type": "string"}},
+        "name": {"type": "string"},
+        "team_id": {"type": "string"},
+    },
+}
+NAMED_SCHEMA = {
+    "type": "object",
+    "properties": {"id": {"type": "string"}, "name": {"type": "string"}, "team_id": {"type": "string"}},
+}
+STREAM_SCHEMAS = {
+    "users": USER_SCHEMA,
+    "teams": NAMED_SCHEMA,
+    "projects": PROJECT_SCHEMA,
+    "groups": GROUP_SCHEMA,
+    "roles": NAMED_SCHEMA,
+    "records": RECORD_SCHEMA,
+}
+FIRST_RECORD_DATE = date(2018, 1, 1)
+LAST_RECORD_DATE = date(2020, 12, 31)
+ONE_YEAR = {"start_date": "2020-01-01", "end_date": "2020-12-31"}
+# Stream synced and config of each scenario
+SCENARIOS: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    "users": ("users", {}),
+    "teams": ("teams", {}),
+    "projects": ("projects", {}),
+    "groups": ("groups", {}),
+    "roles": ("roles", {}),
+    "records": ("records", ONE_YEAR),
+    "records-large-page": ("records", dict(ONE_YEAR, page_size=10000)),
+    "records-concurrent": ("records", dict(ONE_YEAR, max_concurrent_requests=4)),
+    "records-streaming": ("records", dict(ONE_YEAR, stream_pages=True)),
+    "records-multi-year": (
+        "records",
+        {
+            "start_date": FIRST_RECORD_DATE.isoformat(),
+            "end_date": LAST_RECORD_DATE.isoformat(),
+            "records_window": "month",
+        },
+    ),
+}
+
+
+def peak_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_scenario(base_url: str, stream_id: str, config: Dict[str, Any]) -> Tuple[float, int]:
+    """Syncs one stream from the stub server, discarding output, and returns the seconds taken and peak RSS."""
+    # Logging is still done, just not shown
+    devnull_fd = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull_fd, sys.stderr.fileno())
+    os.close(devnull_fd)
+    catalog = make_catalog(stream_id, STREAM_SCHEMAS[stream_id])
+    with open(os.devnull, "w") as devnull, patch("tap_nikabot.client.BASE_URL", base_url), patch(
+        "tap_nikabot.async_client.BASE_URL", base_url
+    ):
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            start = time.perf_counter()
+            sync(config, {}, catalog)
+            elapsed = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+    return elapsed, peak_rss_bytes()
+
+
+def send_scenario_result(connection: Connection, base_url: str, stream_id: str, config: Dict[str, Any]) -> None:
+    connection.send(run_scenario(base_url, stream_id, config))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Defaults to every scenario")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added to every response")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--records-per-day", type=int, default=100)
+    parser.add_argument("--use-asyncio", action="store_true")
+    parser.add_argument("--max-inflight-bytes", type=int, default=0)
+    parser.add_argument("--transform-processes", type=int, default=0)
+    args = parser.parse_args()
+
+    dataset = Dataset(
+        users=args.users,
+        projects=max(1, args.users // 10),
+        groups=max(1, args.users // 100),
+        roles=max(1, args.users // 1000),
+        records_start=FIRST_RECORD_DATE,
+        records_end=LAST_RECORD_DATE,
+        records_per_day=args.records_per_day,
+    )
+    base_config = {
+        "access_token": "benchmark",
+        "page_size": args.page_size,
+        "use_asyncio": args.use_asyncio,
+        "max_inflight_bytes": args.max_inflight_bytes,
+        "transform_processes": args.transform_processes,
+        # The stub isn't rate limited, so neither is the client
+        "rate_limit": 1000000,
+        "retry_base_delay": 0,
+    }
+    spawn = multiprocessing.get_context("spawn")
+    with StubServer(dataset, args.latency_ms / 1000) as server:
+        for name in args.scenario or list(SCENARIOS):
+            stream_id, config = SCENARIOS[name]
+            server.reset()
+            # A process of its own rather than a Pool's, as the pool's processes can't start the transform pool's
+            receiver, sender = spawn.Pipe(duplex=False)
+            process = spawn.Process(
+                target=send_scenario_result, args=(sender, server.url, stream_id, dict(base_config, **config))
+            )
+            process.start()
+            # Closed here too, so receiving fails rather than waiting forever if the process dies
+            sender.close()
+            elapsed, peak_rss = receiver.recv()
+            process.join()
+            rows = server.rows[stream_id]
+            print(
+                f"{name:<20} records: {rows:>10,} records/sec: {rows / elapsed:>10,.0f} "
+                f"requests: {server.requests[stream_id]:>6,} peak RSS: {peak_rss / 2 ** 20:>7,.1f} MiB",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Measures how long the tap takes to start, as short syncs can spend most of their time importing.
+
+Each scenario is run in a new interpreter: importing the package, printing the version, and a complete sync of the
+teams stream from a local stand-in for the API.
+
+USAGE:
+    python -m benchmarks.bench_startup --runs 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.bench_http import STREAM_SCHEMAS
+from benchmarks.bench_sync import make_catalog
+from benchmarks.stub_server import Dataset, StubServer
+
+SYNC_CODE = """
+import sys
+import tap_nikabot.client
+tap_nikabot.client.BASE_URL = sys.argv.pop(1)
+tap_nikabot.main()
+"""
+
+
+def time_command(args: List[str], runs: int, env: Optional[Dict[str, str]] = None) -> List[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: List[float]) -> None:
+    print(f"{name:<10} min: {min(timings) * 1000:>7.1f}ms median: {statistics.median(timings) * 1000:>7.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    report("python", time_command([sys.executable, "-c", "pass"], args.runs))
+    report("import", time_command([sys.executable, "-c", "import tap_nikabot"], args.runs))
+    version_code = "import sys; sys.argv[1:] = ['--version']; import tap_nikabot; tap_nikabot.main()"
+    report("version", time_command([sys.executable, "-c", version_code], args.runs))
+
+    with tempfile.TemporaryDirectory() as temp_dir, StubServer(Dataset()) as server:
+        config_path = os.path.join(temp_dir, "config.json")
+        catalog_path = os.path.join(temp_dir, "catalog.json")
+        with open(config_path, "w") as config_file:
+            json.dump({"access_token": "benchmark", "page_size": 1000}, config_file)
+        with open(catalog_path, "w") as catalog_file:
+            json.dump(make_catalog("teams", STREAM_SCHEMAS["teams"]).to_dict(), catalog_file)
+        command = [sys.executable, "-c", SYNC_CODE, server.url, "--config", config_path, "--catalog", catalog_path]
+        report("sync", time_command(command, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Measures sync throughput on a synthetic records payload without touching the network.
+
+USAGE:
+    python -m benchmarks.bench_sync --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List
+from unittest.mock import patch
+
+from singer.catalog import Catalog, CatalogEntry
+from singer.schema import Schema
+
+from tap_nikabot import sync
+
+RECORD_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "created_at": {"type": "string", "format": "date-time"},
+        "date": {"type": "string", "format": "date-time"},
+        "edited": {
+            "type": "object",
+            "properties": {"author": {"type": "string"}, "date": {"type": "string", "format": "date-time"}},
+        },
+        "hours": {"type": "number", "format": "double"},
+        "id": {"type": "string"},
+        "info": {"type": "string"},
+        "project_id": {"type": "string"},
+        "project_name": {"type": "string"},
+        "team_id": {"type": "string"},
+        "user_id": {"type": "string"},
+    },
+}
+
+
+def make_record(i: int) -> Dict[str, Any]:
+    return {
+        "id": f"{i:024x}",
+        "team_id": "T034F9NPW",
+        "user_id": f"U{i % 500:08d}",
+        "project_name": "CAP - Data Lifecycle",
+        "project_id": f"{i % 50:024x}",
+        "hours": 7.5,
+        "date": f"2020-{i % 12 + 1:02}-{i % 28 + 1:02}T00:00:00",
+        "created_at": "2020-01-01T00:21:22.779",
+    }
+
+
+def make_pages(rows: int, page_size: int) -> List[List[Dict[str, Any]]]:
+    records = [make_record(i) for i in range(rows)]
+    return [records[i : i + page_size] for i in range(0, rows, page_size)]
+
+
+def make_catalog(stream_id: str, schema: Dict[str, Any]) -> Catalog:
+    return Catalog(
+        streams=[
+            CatalogEntry(
+                tap_stream_id=stream_id,
+                stream=stream_id,
+                schema=Schema.from_dict(schema),
+                key_properties=["id"],
+                metadata=[{"breadcrumb": [], "metadata": {"selected": True}}],
+                replication_method="FULL_TABLE",
+            )
+        ]
+    )
+
+
+def run(rows: int, page_size: int, config: Dict[str, Any]) -> float:
+    """Syncs the synthetic records stream, discarding output, and returns records/sec."""
+    pages = make_pages(rows, page_size)
+
+    def get_all_pages(*_: Any, **__: Any) -> Iterator[List[Dict[str, Any]]]:
+        return iter(pages)
+
+    config = dict({"access_token": "benchmark", "page_size": page_size}, **config)
+    catalog = make_catalog("records", RECORD_SCHEMA)
+    with open(os.devnull, "w") as devnull, patch("tap_nikabot.client.Client.get_all_pages", get_all_pages):
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            start = time.perf_counter()
+            sync(config, {}, catalog)
+            elapsed = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+    return rows / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--output-buffer-size", type=int, default=0)
+    args = parser.parse_args()
+    records_per_sec = run(args.rows, args.page_size, {"output_buffer_size": args.output_buffer_size})
+    print(f"records: {args.rows:,} page_size: {args.page_size:,} records/sec: {records_per_sec:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
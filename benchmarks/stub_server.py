@@ -0,0 +1,186 @@
+"""A local stand-in for the Nikabot API serving synthetic pages, so syncs can be measured without the network."""
+import json
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+)
+from urllib.parse import parse_qs, urlsplit
+
+Row = Dict[str, Any]
+TEAM_ID = "T034F9NPW"
+
+
+def make_user(i: int) -> Row:
+    return {
+        "id": f"{i:024x}",
+        "name": f"user.{i}",
+        "deleted": i % 10 == 0,
+        "presence": "active",
+        "user_id": f"U{i:08d}",
+        "team_id": TEAM_ID,
+        "is_admin": False,
+        "tz": "Australia/Canberra",
+        "tz_offset": 36000,
+        "created_at": "2019-09-02T05:13:47.882",
+        "groups": ["TA Stream", "TA Squad 1"],
+        "updated_at": "2020-06-15T06:07:58.272",
+    }
+
+
+def make_project(i: int) -> Row:
+    return {
+        "id": f"{i:024x}",
+        "project_name": f"Project {i}",
+        "team_id": TEAM_ID,
+        "author": f"U{i:08d}",
+        "created_at": "2019-09-02T05:13:47.882",
+        "groups": ["TA Stream"],
+    }
+
+
+def make_group(i: int) -> Row:
+    return {"id": f"{i:024x}", "name": f"Group {i}", "team_id": TEAM_ID, "members": [f"U{i:08d}"]}
+
+
+def make_role(i: int) -> Row:
+    return {"id": f"{i:024x}", "name": f"Role {i}", "team_id": TEAM_ID}
+
+
+def make_record(day: date, i: int) -> Row:
+    return {
+        "id": f"{day.toordinal():08x}{i:016x}",
+        "team_id": TEAM_ID,
+        "user_id": f"U{i % 500:08d}",
+        "project_name": "CAP - Data Lifecycle",
+        "project_id": f"{i % 50:024x}",
+        "hours": 7.5,
+        "date": f"{day.isoformat()}T00:00:00",
+        "created_at": f"{day.isoformat()}T00:21:22.779",
+    }
+
+
+class Dataset:
+    """The rows served by the stub, generated on demand from their index so large datasets take no memory."""
+
+    def __init__(
+        self,
+        users: int = 1000,
+        projects: int = 100,
+        groups: int = 20,
+        roles: int = 10,
+        records_start: date = date(2020, 1, 1),
+        records_end: date = date(2020, 12, 31),
+        records_per_day: int = 100,
+    ) -> None:
+        self.counts = {"users": users, "projects": projects, "groups": groups, "roles": roles}
+        self.records_start = records_start
+        self.records_end = records_end
+        self.records_per_day = records_per_day
+
+    def page(self, endpoint: str, page: int, limit: int, params: Dict[str, str]) -> List[Row]:
+        start = page * limit
+        if endpoint == "records":
+            return self._records(start, limit, params)
+        make_row: Callable[[int], Row] = {
+            "users": make_user,
+            "projects": make_project,
+            "groups": make_group,
+            "roles": make_role,
+        }[endpoint]
+        return [make_row(i) for i in range(start, min(start + limit, self.counts[endpoint]))]
+
+    def _records(self, start: int, limit: int, params: Dict[str, str]) -> List[Row]:
+        first_day = max(self.records_start, _parse_date(params.get("dateStart"), self.records_start))
+        last_day = min(self.records_end, _parse_date(params.get("dateEnd"), self.records_end))
+        total = max(0, (last_day - first_day).days + 1) * self.records_per_day
+        return [
+            make_record(first_day + timedelta(days=i // self.records_per_day), i % self.records_per_day)
+            for i in range(start, min(start + limit, total))
+        ]
+
+
+def _parse_date(value: Optional[str], default: date) -> date:
+    if not value:
+        return default
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+class StubServer:
+    """Serves the dataset on a random local port from a background thread, counting requests and rows served.
+
+    latency seconds are added to every response.
+    """
+
+    def __init__(self, dataset: Dataset, latency: float = 0.0) -> None:
+        self.dataset = dataset
+        self.latency = latency
+        self.requests: "Counter[str]" = Counter()
+        self.rows: "Counter[str]" = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.rows.clear()
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _respond(self, path: str, query: str) -> bytes:
+        endpoint = path.rsplit("/", 1)[-1]
+        params = {k: v[0] for k, v in parse_qs(query).items()}
+        if endpoint == "teams":
+            rows = [{"id": f"{0:024x}", "team_id": TEAM_ID, "name": "Benchmark"}]
+        else:
+            rows = self.dataset.page(endpoint, int(params.get("page", 0)), int(params.get("limit", 1000)), params)
+        with self._lock:
+            self.requests[endpoint] += 1
+            self.rows[endpoint] += len(rows)
+        return json.dumps({"ok": True, "result": rows}, separators=(",", ":")).encode("utf-8")
+
+    def _handler(self) -> Callable[..., BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep connections alive like the real API, so connection pooling is measured too
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # pylint: disable=invalid-name
+                url = urlsplit(self.path)
+                try:
+                    body = server._respond(url.path, url.query)
+                except KeyError:
+                    self.send_error(404)
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_: Any) -> None:
+                pass
+
+        return Handler
@@ -12,8 +12,9 @@ setup(
     keywords=["nikabot", "singer", "stitch", "tap"],
     classifiers=["Programming Language :: Python :: 3 :: Only"],
     py_modules=["tap_nikabot"],
-    install_requires=["singer-python==5.9.0", "requests==2.23.0", "backoff==1.8.0"],
+    install_requires=["singer-python==5.9.0", "requests==2.23.0"],
     extras_require={
+        "orjson": ["orjson"],
         "dev": [
             "black==19.10b0",
             "coverage==5.1",
@@ -30,7 +31,7 @@ setup(
     [console_scripts]
     tap-nikabot=tap_nikabot:main
     """,
-    packages=find_packages(exclude=("tests",)),
+    packages=find_packages(exclude=("tests", "benchmarks")),
     package_data={"schemas": ["tap_nikabot/schemas/*.json"]},
     include_package_data=True,
 )
@@ -1,104 +1,405 @@
 #!/usr/bin/env python3
 import argparse
-from datetime import datetime, timezone
-from typing import Any, Dict, cast
-
-import pkg_resources
-import singer
-from singer import Transformer, metadata, utils
-from singer.catalog import Catalog
+import sys
+from contextlib import ExitStack
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    cast,
+)
 
 from . import streams
-from .client import Client
-from .replication_method import ReplicationMethod
+from .ratelimit import (
+    Backend,
+    FileBackend,
+    MemoryBackend,
+    TokenBucket,
+    default_lock_file,
+)
+
+if TYPE_CHECKING:
+    # Modules importing requests or singer are imported by the functions using them, so --version doesn't wait for
+    # them to load
+    from concurrent.futures import Executor
+
+    import requests
+    from singer.catalog import Catalog, CatalogEntry
+
+    from .client import Timeout
+    from .enrichment import RecordEnricher
+    from .pipeline import ByteBudget
+    from .retry import RetryPolicy
+    from .swagger_cache import SwaggerCache
+    from .transform_pool import TransformPool
 
-LOGGER = singer.get_logger()
-DEFAULT_CONFIG = {"page_size": 1000}
+# Every optional config key but start_date and end_date, which have no default
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "page_size": 1000,
+    "max_concurrent_requests": 1,
+    "stream_pages": False,
+    "adaptive_page_size": False,
+    "min_page_size": 100,
+    "max_page_size": 5000,
+    "output_buffer_size": 0,
+    "parallel_streams": 1,
+    "use_asyncio": False,
+    "rate_limit": 250,
+    "rate_limit_period": 60,
+    "rate_limit_burst": None,
+    "rate_limit_backend": "memory",
+    "rate_limit_file": None,
+    "max_tries": 5,
+    "retry_base_delay": 1,
+    "retry_max_delay": 60,
+    "connect_timeout": 10,
+    "read_timeout": 120,
+    "compress_responses": True,
+    "swagger_cache": False,
+    "swagger_cache_dir": None,
+    "swagger_cache_ttl": 86400,
+    "offline": False,
+    "checkpoint_interval": 0,
+    "metrics": False,
+    "enrich_records": False,
+    "change_detection": False,
+    "change_index_dir": None,
+    "max_inflight_bytes": 0,
+    "pipeline_queue_size": 2,
+    "transform_processes": 0,
+    "lookback_days": 0,
+    "records_window": None,
+    "records_window_workers": 4,
+}
 REQUIRED_CONFIG_KEYS = ["access_token"]
 
 
-try:
-    __version__ = pkg_resources.get_distribution("tap-nikabot").version
-except pkg_resources.DistributionNotFound:
-    __version__ = "0.0.0"
+def __getattr__(name: str) -> Any:
+    # The version is looked up on first use, as reading package metadata is slow
+    if name == "__version__":
+        return version()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def version() -> str:
+    # pylint: disable=import-outside-toplevel
+    try:
+        from importlib.metadata import PackageNotFoundError
+        from importlib.metadata import version as package_version
+    except ImportError:  # pragma: no cover
+        # importlib.metadata was added in Python 3.8
+        import pkg_resources  # type: ignore
+
+        try:
+            return cast(str, pkg_resources.get_distribution("tap-nikabot").version)
+        except pkg_resources.DistributionNotFound:
+            return "0.0.0"
+    try:
+        return package_version("tap-nikabot")
+    except PackageNotFoundError:
+        return "0.0.0"
+
+
+if sys.version_info < (3, 7):
+    # Modules can't look up attributes on first use before Python 3.7, so it's read on import instead
+    __version__ = version()
+
+
+def discover(config: Optional[Dict[str, Any]] = None, session: Optional["requests.Session"] = None) -> "Catalog":
+    # pylint: disable=import-outside-toplevel
+    from singer.catalog import Catalog
+
+    from .client import Client
+    from .schemas import compile_swagger, save_swagger_schemas
+
+    config = config or {}
+    client = Client(
+        config.get("access_token"),
+        config.get("page_size", DEFAULT_CONFIG["page_size"]),
+        retry_policy=retry_policy(config),
+        session=session or http_session(config),
+        timeout=timeout(config),
+    )
+    cache = create_swagger_cache(config)
+    swagger = cache.fetch_swagger_definition(client) if cache else client.fetch_swagger_definition()
+    schemas = compile_swagger(swagger, cache.cache_dir if cache else None)
+    catalog_entries = [stream().get_catalog_entry(schemas) for stream in streams.get_all()]
+    if cache and len(schemas.resolved_definitions) > schemas.saved_count:
+        save_swagger_schemas(schemas, cache.cache_dir)
+    return Catalog(catalog_entries)
+
+
+def create_swagger_cache(config: Dict[str, Any]) -> Optional["SwaggerCache"]:
+    # pylint: disable=import-outside-toplevel
+    from .swagger_cache import SwaggerCache, default_cache_dir
+
+    offline = config.get("offline", DEFAULT_CONFIG["offline"])
+    if not (config.get("swagger_cache", DEFAULT_CONFIG["swagger_cache"]) or offline):
+        return None
+    return SwaggerCache(
+        config.get("swagger_cache_dir") or default_cache_dir(),
+        float(config.get("swagger_cache_ttl", DEFAULT_CONFIG["swagger_cache_ttl"])),
+        offline,
+    )
+
+
+def page_size_bounds(config: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    if not config.get("adaptive_page_size", DEFAULT_CONFIG["adaptive_page_size"]):
+        return None
+    return (
+        int(config.get("min_page_size", DEFAULT_CONFIG["min_page_size"])),
+        int(config.get("max_page_size", DEFAULT_CONFIG["max_page_size"])),
+    )
+
+
+def rate_limiter(config: Dict[str, Any]) -> TokenBucket:
+    backend_name = config.get("rate_limit_backend", DEFAULT_CONFIG["rate_limit_backend"])
+    if backend_name == "memory":
+        backend: Backend = MemoryBackend()
+    elif backend_name == "file":
+        backend = FileBackend(config.get("rate_limit_file") or default_lock_file(config["access_token"]))
+    else:
+        raise ValueError(f"Invalid rate_limit_backend '{backend_name}', valid options are 'memory', 'file'")
+    burst = config.get("rate_limit_burst", DEFAULT_CONFIG["rate_limit_burst"])
+    return TokenBucket(
+        float(config.get("rate_limit", DEFAULT_CONFIG["rate_limit"])),
+        float(config.get("rate_limit_period", DEFAULT_CONFIG["rate_limit_period"])),
+        int(burst) if burst is not None else None,
+        backend,
+    )
+
+
+def retry_policy(config: Dict[str, Any]) -> "RetryPolicy":
+    from .retry import RetryPolicy  # pylint: disable=import-outside-toplevel
+
+    return RetryPolicy(
+        int(config.get("max_tries", DEFAULT_CONFIG["max_tries"])),
+        float(config.get("retry_base_delay", DEFAULT_CONFIG["retry_base_delay"])),
+        float(config.get("retry_max_delay", DEFAULT_CONFIG["retry_max_delay"])),
+    )
+
+
+def connection_pool_size(config: Dict[str, Any]) -> int:
+    """The most requests which can be in flight at once, so every connection can be kept alive for reuse."""
+    from requests.adapters import DEFAULT_POOLSIZE  # pylint: disable=import-outside-toplevel
+
+    concurrency = int(config.get("max_concurrent_requests", DEFAULT_CONFIG["max_concurrent_requests"]))
+    if config.get("records_window", DEFAULT_CONFIG["records_window"]):
+        concurrency *= int(config.get("records_window_workers", DEFAULT_CONFIG["records_window_workers"]))
+    if config.get("use_asyncio", DEFAULT_CONFIG["use_asyncio"]):
+        concurrency *= len(streams.stream_ids)
+    else:
+        concurrency *= int(config.get("parallel_streams", DEFAULT_CONFIG["parallel_streams"]))
+    return max(DEFAULT_POOLSIZE, concurrency)
+
 
+def http_session(config: Dict[str, Any]) -> "requests.Session":
+    from .client import create_session  # pylint: disable=import-outside-toplevel
 
-def discover() -> Catalog:
-    swagger = Client.fetch_swagger_definition()
-    schemas = [stream().get_catalog_entry(swagger) for stream in streams.all_streams]
-    return Catalog(schemas)
+    return create_session(
+        connection_pool_size(config), config.get("compress_responses", DEFAULT_CONFIG["compress_responses"])
+    )
 
 
-def sync(config: Dict[str, Any], state: Dict[str, Any], catalog: Catalog) -> None:
+def byte_budget(config: Dict[str, Any]) -> Optional["ByteBudget"]:
+    """The budget shared by the pipelines of every stream, or None to write each page as it's fetched."""
+    from .pipeline import ByteBudget  # pylint: disable=import-outside-toplevel
+
+    max_inflight_bytes = int(config.get("max_inflight_bytes", DEFAULT_CONFIG["max_inflight_bytes"]))
+    return ByteBudget(max_inflight_bytes) if max_inflight_bytes > 0 else None
+
+
+def create_transform_pool(
+    config: Dict[str, Any], selected_streams: List["CatalogEntry"], enricher: Optional["RecordEnricher"] = None
+) -> Optional["TransformPool"]:
+    """The worker processes records are transformed on, or None to transform them on the syncing threads."""
+    # pylint: disable=import-outside-toplevel
+    from .stream_sync import stream_schema
+    from .transform_pool import TransformPool
+
+    transform_processes = int(config.get("transform_processes", DEFAULT_CONFIG["transform_processes"]))
+    if transform_processes <= 0:
+        return None
+    schemas = {s.tap_stream_id: stream_schema(config, s, enricher) for s in selected_streams}
+    return TransformPool(transform_processes, schemas)
+
+
+def enrich_records(config: Dict[str, Any], selected_streams: List["CatalogEntry"]) -> bool:
+    if not config.get("enrich_records", DEFAULT_CONFIG["enrich_records"]):
+        return False
+    return any(streams.get(s.tap_stream_id).enrichable for s in selected_streams)
+
+
+def timeout(config: Dict[str, Any]) -> "Timeout":
+    return (
+        float(config.get("connect_timeout", DEFAULT_CONFIG["connect_timeout"])),
+        float(config.get("read_timeout", DEFAULT_CONFIG["read_timeout"])),
+    )
+
+
+def sync(
+    config: Dict[str, Any], state: Dict[str, Any], catalog: "Catalog", session: Optional["requests.Session"] = None
+) -> None:
     """ Sync data from tap source """
-    client = Client(config["access_token"], config["page_size"])
-    # Loop over selected streams in catalog
-    for selected_stream in catalog.get_selected_streams(state):
-        LOGGER.info("Syncing stream: %s", selected_stream.tap_stream_id)
-
-        bookmark_column = selected_stream.replication_key
-        replication_method = (
-            ReplicationMethod[selected_stream.replication_method] if selected_stream.replication_method else None
-        )
-        last_bookmark = state.get(selected_stream.tap_stream_id)
+    # pylint: disable=import-outside-toplevel
+    from concurrent.futures import ThreadPoolExecutor
 
-        singer.write_schema(
-            stream_name=selected_stream.tap_stream_id,
-            schema=selected_stream.schema.to_dict(),
-            key_properties=selected_stream.key_properties,
-            bookmark_properties=[bookmark_column] if bookmark_column else None,
+    from . import metrics
+    from .client import Client
+    from .enrichment import load_record_enricher
+    from .metrics import StreamMetrics
+    from .stream_sync import StreamSync
+    from .writer import MessageWriter
+
+    session = session or http_session(config)
+    if config.get("use_asyncio", DEFAULT_CONFIG["use_asyncio"]):
+        sync_async(config, state, catalog, session)
+        return
+
+    client = Client(
+        config["access_token"],
+        config["page_size"],
+        config.get("max_concurrent_requests", DEFAULT_CONFIG["max_concurrent_requests"]),
+        config.get("stream_pages", DEFAULT_CONFIG["stream_pages"]),
+        page_size_bounds(config),
+        rate_limiter(config),
+        retry_policy(config),
+        session,
+        timeout(config),
+    )
+    new_state = dict(state)
+    stream_metrics: List[StreamMetrics] = []
+    parallel_streams = int(config.get("parallel_streams", DEFAULT_CONFIG["parallel_streams"]))
+    selected_streams = list(catalog.get_selected_streams(state))
+    enricher = load_record_enricher(client) if enrich_records(config, selected_streams) else None
+    budget = byte_budget(config)
+    queue_size = int(config.get("pipeline_queue_size", DEFAULT_CONFIG["pipeline_queue_size"]))
+    pool = create_transform_pool(config, selected_streams, enricher)
+    with ExitStack() as stack:
+        if pool is not None:
+            stack.enter_context(pool)
+        writer = stack.enter_context(
+            MessageWriter(config.get("output_buffer_size", DEFAULT_CONFIG["output_buffer_size"]))
         )
 
-        stream = streams.get(selected_stream.tap_stream_id)
-        max_bookmark = last_bookmark if replication_method == ReplicationMethod.INCREMENTAL else None
-        for records in stream().get_records(client, config, bookmark_column, last_bookmark, replication_method):
-            if len(records) == 0:
-                continue
-            # write one or more rows to the stream:
-            with Transformer() as transformer:
-                for record in records:
-                    singer.write_record(
-                        selected_stream.tap_stream_id,
-                        transformer.transform(
-                            record, selected_stream.schema.to_dict(), metadata.to_map(selected_stream.metadata),
-                        ),
-                        time_extracted=datetime.now(timezone.utc),
-                    )
-            if bookmark_column:
-                if stream.replication_key_is_sorted:
-                    # update bookmark to latest value
-                    singer.write_state({selected_stream.tap_stream_id: records[-1][bookmark_column]})
-                else:
-                    local_max_bookmark = max([row[bookmark_column] for row in records])
-                    # if data unsorted, save max value until end of writes
-                    max_bookmark = max(max_bookmark, local_max_bookmark) if max_bookmark else local_max_bookmark
-        if bookmark_column and not stream.replication_key_is_sorted:
-            singer.write_state({selected_stream.tap_stream_id: max_bookmark})
+        def sync_stream(selected_stream: "CatalogEntry") -> None:
+            with StreamSync(config, state, selected_stream, writer, new_state, enricher) as stream_sync:
+                if stream_sync.metrics is not None:
+                    stream_metrics.append(stream_sync.metrics)
+                with metrics.activated(stream_sync.metrics):
+                    stream_sync.sync_records(client, budget, queue_size, pool)
+
+        if parallel_streams > 1:
+            with ThreadPoolExecutor(max_workers=parallel_streams) as executor:
+                futures = [executor.submit(sync_stream, s) for s in selected_streams]
+                for future in futures:
+                    future.result()
+        else:
+            # Loop over selected streams in catalog
+            for selected_stream in selected_streams:
+                sync_stream(selected_stream)
+    metrics.log_summary(stream_metrics)
+
+
+def sync_async(
+    config: Dict[str, Any], state: Dict[str, Any], catalog: "Catalog", session: Optional["requests.Session"] = None
+) -> None:
+    """Syncs all selected streams concurrently on an asyncio event loop."""
+    # asyncio is slow to import, so it's only loaded by syncs using it
+    # pylint: disable=import-outside-toplevel
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    loop = asyncio.new_event_loop()
+    # Requests are still sent on threads, one for every connection so they aren't limited by the loop's default
+    # executor
+    try:
+        with ThreadPoolExecutor(max_workers=connection_pool_size(config)) as executor:
+            loop.run_until_complete(_sync_async(config, state, catalog, session or http_session(config), executor))
+    finally:
+        loop.close()
+
+
+async def _sync_async(
+    config: Dict[str, Any],
+    state: Dict[str, Any],
+    catalog: "Catalog",
+    session: "requests.Session",
+    executor: "Executor",
+) -> None:
+    # pylint: disable=import-outside-toplevel
+    import asyncio
+
+    from . import metrics
+    from .async_client import AsyncClient, RequestsTransport
+    from .enrichment import load_record_enricher_async
+    from .metrics import StreamMetrics
+    from .stream_sync import StreamSync
+    from .writer import MessageWriter
+
+    client = AsyncClient(
+        config["access_token"],
+        config["page_size"],
+        transport=RequestsTransport(session, timeout(config), executor),
+        rate_limiter=rate_limiter(config),
+        retry_policy=retry_policy(config),
+    )
+    new_state = dict(state)
+    stream_metrics: List[StreamMetrics] = []
+    selected_streams = list(catalog.get_selected_streams(state))
+    enricher = await load_record_enricher_async(client) if enrich_records(config, selected_streams) else None
+
+    async def sync_stream(selected_stream: "CatalogEntry") -> None:
+        with StreamSync(config, state, selected_stream, writer, new_state, enricher) as stream_sync:
+            if stream_sync.metrics is not None:
+                stream_metrics.append(stream_sync.metrics)
+            # Streams are synced on the same thread, so each has a client collecting its metrics
+            async for records in stream_sync.get_records_async(client.with_metrics(stream_sync.metrics)):
+                stream_sync.write_records(records)
+
+    with MessageWriter(config.get("output_buffer_size", DEFAULT_CONFIG["output_buffer_size"])) as writer:
+        await asyncio.gather(*(sync_stream(s) for s in selected_streams))
+    metrics.log_summary(stream_metrics)
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
-    parser.add_argument("--version", action="version", version="%(prog)s v" + __version__)
-    parser.parse_known_args()
+    parser.add_argument("--version", action="store_true", help="show program's version number and exit")
+    if parser.parse_known_args()[0].version:
+        print(f"{parser.prog} v{version()}")
+        parser.exit()
+    from singer import utils  # pylint: disable=import-outside-toplevel
+
     return cast(argparse.Namespace, utils.parse_args(REQUIRED_CONFIG_KEYS))
 
 
-@utils.handle_top_exception(LOGGER)
 def main() -> None:
+    # Parsed before singer is imported, so printing the version doesn't wait for it to load
     args = parse_args()
+    import singer  # pylint: disable=import-outside-toplevel
+
+    singer.utils.handle_top_exception(singer.get_logger())(_main)(args)
+
+
+def _main(args: argparse.Namespace) -> None:
     config = dict(DEFAULT_CONFIG, **args.config)
+    # Discovery and sync share connections
+    session = http_session(config)
 
     # If discover flag was passed, run discovery mode and dump output to stdout
     if args.discover:
-        catalog = discover()
+        catalog = discover(config, session)
         catalog.dump()
     # Otherwise run in sync mode
     else:
         if args.catalog:
             catalog = args.catalog
         else:
-            catalog = discover()
-        sync(config, args.state, catalog)
+            catalog = discover(config, session)
+        sync(config, args.state, catalog, session)
 
 
 if __name__ == "__main__":
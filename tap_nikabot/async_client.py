@@ -0,0 +1,167 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from copy import copy
+from functools import partial
+from typing import (
+    AsyncIterator,
+    Dict,
+    List,
+    Mapping,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    cast,
+)
+
+import requests
+import singer
+
+from . import jsonlib, metrics
+from .client import (
+    BASE_URL,
+    DEFAULT_TIMEOUT,
+    MAX_API_PAGES,
+    Timeout,
+    create_session,
+)
+from .errors import ServerError
+from .metrics import StreamMetrics
+from .ratelimit import TokenBucket
+from .retry import RetryPolicy
+from .typing import JsonResult
+
+LOGGER = singer.get_logger()
+
+
+class TransportResponse(NamedTuple):
+    status_code: int
+    headers: Mapping[str, str]
+    content: bytes
+
+
+class Transport(ABC):
+    """Sends HTTP requests for the AsyncClient, can be replaced with a local stub for testing."""
+
+    @abstractmethod
+    async def request(
+        self, method: str, url: str, headers: Mapping[str, str], params: Optional[Mapping[str, str]]
+    ) -> TransportResponse:
+        raise NotImplementedError
+
+
+class RequestsTransport(Transport):
+    """Sends requests with a requests.Session on threads of executor, or the event loop's default executor.
+
+    Each request in flight still takes a thread, so executor should have a thread for each request which can be in
+    flight at once. The default executor has at most min(32, CPUs + 4) threads, which limits concurrency.
+    """
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self.session = session or create_session()
+        self.timeout = timeout
+        self.executor = executor
+
+    async def request(
+        self, method: str, url: str, headers: Mapping[str, str], params: Optional[Mapping[str, str]]
+    ) -> TransportResponse:
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(
+            self.executor,
+            partial(self.session.request, method, url, headers=headers, params=params, timeout=self.timeout),
+        )
+        return TransportResponse(response.status_code, response.headers, response.content)
+
+
+class AsyncClient:
+    def __init__(
+        self,
+        access_token: str,
+        page_size: str,
+        transport: Optional[Transport] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ) -> None:
+        self.headers = {"Authorization": f"Bearer {access_token}"}
+        self.page_size = page_size
+        self.transport = transport or RequestsTransport()
+        self.rate_limiter = rate_limiter or TokenBucket(250, 60)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.stream_metrics: Optional[StreamMetrics] = None
+
+    def with_metrics(self, stream_metrics: Optional[StreamMetrics]) -> "AsyncClient":
+        """A client sharing this one's transport, rate limit and retries which collects the metrics of a stream."""
+        client = copy(self)
+        client.stream_metrics = stream_metrics
+        return client
+
+    async def get(self, url: str) -> List[JsonResult]:
+        return await self._make_request("GET", url)
+
+    async def get_one_page(
+        self, page: int, url: str, additional_params: Optional[MutableMapping[str, str]] = None
+    ) -> List[JsonResult]:
+        params = {"limit": str(self.page_size), "page": str(page)}
+        if additional_params:
+            params.update(additional_params)
+        return await self._make_request("GET", url, params=params)
+
+    async def get_all_pages(
+        self, url: str, params: Optional[MutableMapping[str, str]] = None, offset: int = 0
+    ) -> AsyncIterator[List[JsonResult]]:
+        """Yields every page of results, starting after the first offset rows."""
+        start_page, skip = divmod(offset, int(self.page_size))
+        for page in range(start_page, MAX_API_PAGES):
+            result = await self.get_one_page(page, url, params)
+            if len(result) == 0:
+                break
+            if page == start_page and skip:
+                result = result[skip:]
+                if not result:
+                    continue
+            yield result
+
+    async def _make_request(
+        self, method: str, endpoint: str, params: Optional[Dict[str, str]] = None
+    ) -> List[JsonResult]:
+        full_url = BASE_URL + endpoint
+        stream_metrics = self.stream_metrics
+        attempt = 1
+        while True:
+            rate_limit_wait = await self.rate_limiter.acquire_async()
+            if stream_metrics is not None:
+                stream_metrics.add_time(metrics.RATE_LIMIT, rate_limit_wait)
+            LOGGER.info("Making %s request to %s with params %s", method.upper(), full_url, params)
+            error: requests.exceptions.RequestException
+            try:
+                start = time.perf_counter()
+                response = await self.transport.request(method, full_url, self.headers, params)
+                if stream_metrics is not None:
+                    stream_metrics.add_request(time.perf_counter() - start, len(response.content))
+            except requests.exceptions.RequestException as request_error:
+                error = request_error
+                delay = self.retry_policy.delay_for_error(attempt, error)
+            else:
+                if response.status_code < 400:
+                    break
+                error = requests.exceptions.HTTPError(f"{response.status_code} Error for url: {full_url}")
+                delay = self.retry_policy.delay(attempt, response.status_code, response.headers)
+            if delay is None:
+                raise error
+            self.retry_policy.record(delay, error, stream_metrics)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        start = time.perf_counter()
+        result = jsonlib.loads(response.content)
+        if stream_metrics is not None:
+            stream_metrics.add_time(metrics.DECODE, time.perf_counter() - start)
+        if not result.get("ok", False):
+            raise ServerError(result.get("message"))
+        return cast(List[JsonResult], result["result"])
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, List, Optional, Tuple
+
+from dateutil.parser import isoparse
+
+from .typing import JsonResult
+
+# Kinds of bookmark value, so values of different kinds still compare instead of raising
+_NUMBER = 0
+_DATETIME = 1
+_STRING = 2
+
+
+def bookmark_key(value: Any) -> Tuple[int, Any]:
+    """The key bookmark values are compared by.
+
+    ISO 8601 date-times are compared by the instant they refer to, as the API returns them in more than one format
+    (with and without fractional seconds or a UTC suffix) which compare wrongly as strings. Date-times without a
+    timezone are in UTC. Any other string is compared as a string.
+    """
+    if isinstance(value, str):
+        return _string_key(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _NUMBER, value
+    return _STRING, str(value)
+
+
+# Replication keys such as dates repeat across pages, so their keys are cached rather than parsed again
+@lru_cache(maxsize=4096)
+def _string_key(value: str) -> Tuple[int, Any]:
+    parsed = _parse_datetime(value)
+    if parsed is None:
+        return _STRING, value
+    return _DATETIME, parsed
+
+
+def _parse_datetime(value: str) -> Optional[datetime]:
+    try:
+        parsed: datetime = isoparse(value)
+    except (ValueError, OverflowError):
+        return None
+    return parsed.astimezone(timezone.utc) if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+class BookmarkTracker:
+    """The running maximum of a replication key, for streams which aren't sorted by it.
+
+    The values of a page are compared as they are with max, as fast as the list max this replaced without building
+    the list. That orders the API's date-times correctly unless two in the same second are in different formats. Only
+    the largest of each page is compared with bookmark_key, as the bookmark it's compared with may come from STATE or
+    a checkpoint in a different format or timezone. The largest value is output as it was read rather than as parsed.
+    """
+
+    __slots__ = ("value", "key")
+
+    def __init__(self, value: Any = None) -> None:
+        self.value: Any = None
+        self.key: Optional[Tuple[int, Any]] = None
+        self.update(value)
+
+    def update(self, value: Any) -> None:
+        if value is not None and value != self.value:
+            self._update(bookmark_key(value), value)
+
+    def update_rows(self, rows: List[JsonResult], column: str) -> None:
+        try:
+            largest = max(map(itemgetter(column), rows), default=None)
+        except TypeError:
+            # Values of different kinds or None can't be compared with max
+            for row in rows:
+                self.update(row[column])
+            return
+        self.update(largest)
+
+    def merge(self, other: "BookmarkTracker") -> None:
+        """Adds the value tracked by other, without parsing it again."""
+        if other.key is not None:
+            self._update(other.key, other.value)
+
+    def _update(self, key: Tuple[int, Any], value: Any) -> None:
+        if self.key is None or key > self.key:
+            self.value = value
+            self.key = key
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import singer
+
+from . import jsonlib
+from .typing import JsonResult
+
+LOGGER = singer.get_logger()
+# State key of the hash index of each stream, when it's not kept in a file
+HASHES_KEY = "hashes"
+# Added to the schema and set on the record output for a row which has disappeared
+DELETED_AT = "_sdc_deleted_at"
+
+
+def record_digest(record: JsonResult) -> str:
+    """A short hash of a record's content, the same whatever order its keys are in."""
+    content = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ChangeIndex:
+    """Tracks the digest of each row of a full table stream to output only new and changed rows.
+
+    previous holds the digests from the last sync by row key. Rows are checked with changed as they're read, and the
+    keys of rows not seen this sync are given by deleted_keys once the stream is complete.
+    """
+
+    def __init__(self, key_property: str, previous: Optional[Dict[str, str]] = None) -> None:
+        self.key_property = key_property
+        self.previous = previous or {}
+        self.current: Dict[str, str] = {}
+        self.changed_count = 0
+
+    def changed(self, record: JsonResult) -> bool:
+        return self.changed_digest(str(record[self.key_property]), record_digest(record))
+
+    def changed_digest(self, key: str, digest: str) -> bool:
+        """Checks a row by its key and the digest of its content, when the digest has already been calculated."""
+        self.current[key] = digest
+        if self.previous.get(key) == digest:
+            return False
+        self.changed_count += 1
+        return True
+
+    def deleted_keys(self) -> List[str]:
+        return [key for key in self.previous if key not in self.current]
+
+    def tombstone(self, key: str, deleted_at: datetime) -> JsonResult:
+        return {self.key_property: key, DELETED_AT: deleted_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")}
+
+    @staticmethod
+    def extend_schema(schema: JsonResult) -> JsonResult:
+        """Returns a copy of schema with the deleted at field added."""
+        properties = dict(schema.get("properties", {}))
+        properties[DELETED_AT] = {"type": ["null", "string"], "format": "date-time"}
+        return dict(schema, properties=properties)
+
+
+class HashIndexFile:
+    """Keeps the hash index of each stream in a JSON file in a directory, rather than in STATE."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def path(self, stream_id: str) -> str:
+        return os.path.join(self.directory, f"{stream_id}.json")
+
+    def read(self, stream_id: str) -> Optional[Dict[str, str]]:
+        try:
+            with open(self.path(stream_id), "rb") as index_file:
+                return dict(jsonlib.loads(index_file.read()))
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            LOGGER.warning("Ignoring invalid hash index %s, every row will be output", self.path(stream_id))
+            return None
+
+    def write(self, stream_id: str, hashes: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{stream_id}-")
+        try:
+            with os.fdopen(fd, "w") as index_file:
+                json.dump(hashes, index_file, separators=(",", ":"))
+            os.replace(temp_path, self.path(stream_id))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
@@ -1,9 +1,15 @@
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import (
     IO,
     Any,
+    Deque,
+    Dict,
     Iterable,
     Iterator,
     List,
+    Mapping,
     MutableMapping,
     Optional,
     Tuple,
@@ -11,28 +17,94 @@ from typing import (
     cast,
 )
 
-import backoff
 import requests
 import singer
-from singer import utils
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
 
+from . import jsonlib, jsonstream, metrics
 from .errors import ServerError
+from .pagination import AdaptivePageSize
+from .ratelimit import TokenBucket
+from .retry import RetryPolicy
 from .typing import JsonResult
 
 LOGGER = singer.get_logger()
 MAX_API_PAGES = 10000
+# Number of records yielded at a time when streaming pages
+STREAM_BATCH_SIZE = 100
+STREAM_CHUNK_SIZE = 64 * 1024
 BASE_URL = "https://api.nikabot.com"
 
 _Data = Union[
     None, str, bytes, MutableMapping[str, Any], MutableMapping[str, Any], Iterable[Tuple[str, Optional[str]]], IO
 ]
+# Seconds to wait to connect and between bytes of the response
+Timeout = Tuple[float, float]
+DEFAULT_TIMEOUT: Timeout = (10, 120)
+
+
+def create_session(pool_size: int = DEFAULT_POOLSIZE, compress: bool = True) -> requests.Session:
+    """Creates a session which keeps up to pool_size connections to the API alive for reuse.
+
+    The pool should be at least as large as the number of concurrent requests, otherwise connections beyond the pool
+    size are closed after each request. With compress the API is asked to gzip responses, which saves transfer time at
+    the cost of decompressing them.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate" if compress else "identity"
+    return session
+
+
+def skip_rows(pages: Iterator[List[JsonResult]], rows: int) -> Iterator[List[JsonResult]]:
+    """Drops the first rows from an iterator of pages."""
+    for page in pages:
+        if rows > 0:
+            skipped = min(rows, len(page))
+            page = page[skipped:]
+            rows -= skipped
+            if not page:
+                continue
+        yield page
 
 
 class Client:
-    def __init__(self, access_token: str, page_size: str) -> None:
-        self.session = requests.Session()
-        self.session.headers.update({"Authorization": f"Bearer {access_token}"})
+    def __init__(
+        self,
+        access_token: Optional[str],
+        page_size: str,
+        max_concurrent_requests: int = 1,
+        stream_pages: bool = False,
+        page_size_bounds: Optional[Tuple[int, int]] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        session: Optional[requests.Session] = None,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+    ) -> None:
+        # Each of these changes how pages are fetched, so only one can be used at once
+        page_modes = [
+            option
+            for option, enabled in (
+                ("max_concurrent_requests", int(max_concurrent_requests) > 1),
+                ("stream_pages", stream_pages),
+                ("adaptive_page_size", page_size_bounds is not None),
+            )
+            if enabled
+        ]
+        if len(page_modes) > 1:
+            raise ValueError(f"Only one of {', '.join(page_modes)} can be used at once")
+        self.session = session or create_session(max(DEFAULT_POOLSIZE, int(max_concurrent_requests)))
+        if access_token:
+            self.session.headers.update({"Authorization": f"Bearer {access_token}"})
+        self.timeout = timeout
         self.page_size = page_size
+        self.max_concurrent_requests = max(1, int(max_concurrent_requests))
+        self.stream_pages = stream_pages
+        self.page_size_bounds = page_size_bounds
+        self.rate_limiter = rate_limiter or TokenBucket(250, 60)
+        self.retry_policy = retry_policy or RetryPolicy()
 
     def get(self, url: str) -> List[JsonResult]:
         return self._make_request("GET", url)
@@ -40,20 +112,126 @@ class Client:
     def get_one_page(
         self, page: int, url: str, additional_params: Optional[MutableMapping[str, str]] = None
     ) -> List[JsonResult]:
-        params = {"limit": str(self.page_size), "page": str(page)}
+        return self._make_request("GET", url, params=self._page_params(page, additional_params))
+
+    def stream_one_page(
+        self, page: int, url: str, additional_params: Optional[MutableMapping[str, str]] = None
+    ) -> Iterator[List[JsonResult]]:
+        """Yields the records of a page in batches as they're parsed from the response.
+
+        If the response fails partway through, the page is requested again as the retry policy allows and the records
+        already yielded are skipped.
+        """
+        params = self._page_params(page, additional_params)
+        attempt = 1
+        yielded = 0
+        while True:
+            response = self._make_streaming_request("GET", url, params=params)
+            try:
+                with response:
+                    batches = jsonstream.iter_result(
+                        metrics.count_bytes(response.iter_content(STREAM_CHUNK_SIZE)), STREAM_BATCH_SIZE
+                    )
+                    for batch in skip_rows(batches, yielded):
+                        yielded += len(batch)
+                        yield batch
+                return
+            except requests.exceptions.RequestException as error:
+                if not self.retry_policy.backoff(attempt, error):
+                    raise
+                attempt += 1
+
+    def _page_params(
+        self, page: int, additional_params: Optional[MutableMapping[str, str]], page_size: Optional[int] = None
+    ) -> Dict[str, str]:
+        params = {"limit": str(page_size or self.page_size), "page": str(page)}
         if additional_params:
             params.update(additional_params)
-        return self._make_request("GET", url, params=params)
+        return params
+
+    def get_all_pages(
+        self, url: str, params: Optional[MutableMapping[str, str]] = None, offset: int = 0
+    ) -> Iterator[List[JsonResult]]:
+        """Yields every page of results, starting after the first offset rows."""
+        if self.page_size_bounds:
+            return self._get_all_pages_adaptively(url, params, offset, *self.page_size_bounds)
+        start_page, skip = divmod(offset, int(self.page_size))
+        if self.max_concurrent_requests > 1:
+            pages = self._get_all_pages_concurrently(url, params, start_page)
+        elif self.stream_pages:
+            pages = self._get_all_pages_streaming(url, params, start_page)
+        else:
+            pages = self._get_all_pages_sequentially(url, params, start_page)
+        return skip_rows(pages, skip) if skip else pages
 
-    def get_all_pages(self, url: str, params: Optional[MutableMapping[str, str]] = None) -> Iterator[List[JsonResult]]:
-        for page in range(MAX_API_PAGES):
+    def _get_all_pages_sequentially(
+        self, url: str, params: Optional[MutableMapping[str, str]], start_page: int
+    ) -> Iterator[List[JsonResult]]:
+        for page in range(start_page, MAX_API_PAGES):
             result = self.get_one_page(page, url, params)
             if len(result) == 0:
                 break
             yield result
 
-    @backoff.on_exception(backoff.constant, requests.exceptions.HTTPError, max_tries=3, interval=10)
-    @utils.ratelimit(250, 60)
+    def _get_all_pages_adaptively(
+        self, url: str, params: Optional[MutableMapping[str, str]], offset: int, min_page_size: int, max_page_size: int
+    ) -> Iterator[List[JsonResult]]:
+        tuner = AdaptivePageSize(int(self.page_size), min_page_size, max_page_size)
+        for _ in range(MAX_API_PAGES):
+            page_size = tuner.page_size
+            page = tuner.page_for_offset(offset)
+            start = time.perf_counter()
+            result, response_bytes = self._make_sized_request(
+                "GET", url, params=self._page_params(page, params, page_size)
+            )
+            elapsed = time.perf_counter() - start
+            if len(result) == 0:
+                break
+            # Rows before the offset were already yielded, when resuming or after a short page
+            skip = offset - page * page_size
+            # Only whole pages move the offset, a short page is re-requested as the next page at the same size
+            offset = (page + 1) * page_size
+            tuner.update(offset, len(result), elapsed, response_bytes)
+            if skip < len(result):
+                yield result[skip:] if skip else result
+
+    def _get_all_pages_streaming(
+        self, url: str, params: Optional[MutableMapping[str, str]], start_page: int
+    ) -> Iterator[List[JsonResult]]:
+        for page in range(start_page, MAX_API_PAGES):
+            record_count = 0
+            for batch in self.stream_one_page(page, url, params):
+                record_count += len(batch)
+                yield batch
+            if record_count == 0:
+                break
+
+    def _get_all_pages_concurrently(
+        self, url: str, params: Optional[MutableMapping[str, str]], start_page: int
+    ) -> Iterator[List[JsonResult]]:
+        """Keeps up to max_concurrent_requests pages in flight, yielding them in page order.
+
+        Requests already sent for pages past the first empty page are discarded.
+        """
+        get_one_page = metrics.run_in_context(self.get_one_page)
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
+            pending: Deque[Future[List[JsonResult]]] = deque()
+            next_page = start_page
+            try:
+                while True:
+                    while len(pending) < self.max_concurrent_requests and next_page < MAX_API_PAGES:
+                        pending.append(executor.submit(get_one_page, next_page, url, params))
+                        next_page += 1
+                    if not pending:
+                        break
+                    result = pending.popleft().result()
+                    if len(result) == 0:
+                        break
+                    yield result
+            finally:
+                for future in pending:
+                    future.cancel()
+
     def _make_request(
         self,
         method: str,
@@ -62,22 +240,75 @@ class Client:
         params: Union[None, bytes, MutableMapping[str, str]] = None,
         data: _Data = None,
     ) -> List[JsonResult]:
+        return self._make_sized_request(method, endpoint, headers, params, data)[0]
+
+    def _make_sized_request(
+        self,
+        method: str,
+        endpoint: str,
+        headers: Optional[MutableMapping[str, str]] = None,
+        params: Union[None, bytes, MutableMapping[str, str]] = None,
+        data: _Data = None,
+    ) -> Tuple[List[JsonResult], int]:
+        """Makes a request, returning its result and the size of the response in bytes."""
         full_url = BASE_URL + endpoint
-        LOGGER.info("Making %s request to %s with params %s", method.upper(), full_url, params)
 
-        response = self.session.request(method, full_url, headers=headers, params=params, data=data)
-        response.raise_for_status()
-        result = response.json()
+        def request() -> requests.Response:
+            metrics.add_time(metrics.RATE_LIMIT, self.rate_limiter.acquire())
+            LOGGER.info("Making %s request to %s with params %s", method.upper(), full_url, params)
+            start = time.perf_counter()
+            response = self.session.request(
+                method, full_url, headers=headers, params=params, data=data, timeout=self.timeout
+            )
+            if stream_metrics is not None:
+                stream_metrics.add_request(time.perf_counter() - start, len(response.content))
+            response.raise_for_status()
+            return response
+
+        stream_metrics = metrics.current()
+        response = self.retry_policy.call(request)
+        start = time.perf_counter()
+        result = jsonlib.loads(response.content)
+        if stream_metrics is not None:
+            stream_metrics.add_time(metrics.DECODE, time.perf_counter() - start)
         if not result.get("ok", False):
             raise ServerError(result.get("message"))
-        return cast(List[JsonResult], result["result"])
+        return cast(List[JsonResult], result["result"]), len(response.content)
 
-    @staticmethod
-    @backoff.on_exception(backoff.constant, requests.exceptions.HTTPError, max_tries=3, interval=10)
-    def fetch_swagger_definition() -> Any:
-        full_url = BASE_URL + "/v2/api-docs?group=public"
-        LOGGER.info("Fetching swagger definition from %s", full_url)
-        response = requests.get(full_url)
-        response.raise_for_status()
-        swagger = response.json()
+    def _make_streaming_request(
+        self, method: str, endpoint: str, params: Optional[MutableMapping[str, str]] = None
+    ) -> requests.Response:
+        full_url = BASE_URL + endpoint
+
+        def request() -> requests.Response:
+            metrics.add_time(metrics.RATE_LIMIT, self.rate_limiter.acquire())
+            LOGGER.info("Making %s request to %s with params %s", method.upper(), full_url, params)
+            start = time.perf_counter()
+            response = self.session.request(method, full_url, params=params, stream=True, timeout=self.timeout)
+            # Streamed content is counted as it's read, so this is only the time to the response headers
+            metrics.add_request(time.perf_counter() - start, 0)
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError:
+                response.close()
+                raise
+            return response
+
+        return self.retry_policy.call(request)
+
+    def fetch_swagger_definition(self) -> Any:
+        response = self.request_swagger_definition()
+        swagger = jsonlib.loads(response.content)
         return swagger
+
+    def request_swagger_definition(self, headers: Optional[Mapping[str, str]] = None) -> requests.Response:
+        """Requests the swagger definition, headers can make it a conditional request answered with 304."""
+        full_url = BASE_URL + "/v2/api-docs?group=public"
+
+        def request() -> requests.Response:
+            LOGGER.info("Fetching swagger definition from %s", full_url)
+            response = self.session.get(full_url, headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+            return response
+
+        return self.retry_policy.call(request)
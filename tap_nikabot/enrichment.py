@@ -0,0 +1,75 @@
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Tuple,
+)
+
+import singer
+
+from . import streams
+from .client import Client
+from .typing import JsonResult
+
+if TYPE_CHECKING:
+    from .async_client import AsyncClient
+
+LOGGER = singer.get_logger()
+# Each field added to records: the dimension stream it comes from, the record field referring to a row of that
+# stream, the row's field referred to and the row's field copied
+ENRICHED_FIELDS: Dict[str, Tuple[str, str, str, str]] = {
+    "user_name": ("users", "user_id", "user_id", "name"),
+    "team_domain": ("teams", "team_id", "platform_id", "domain"),
+    "project_client": ("projects", "project_id", "id", "client"),
+}
+
+
+class RecordEnricher:
+    """Adds fields of the user, team and project each record refers to, so they needn't be joined downstream.
+
+    The dimension streams are small, so they're fetched once per sync and each enriched field is indexed in a dict
+    by the id records refer to it with. A record referring to an unknown id is given None.
+    """
+
+    def __init__(self, dimensions: Dict[str, List[JsonResult]]) -> None:
+        self.lookups: Dict[str, Tuple[str, Dict[Any, Any]]] = {
+            field: (record_key, {row.get(row_key): row.get(row_field) for row in dimensions[stream_id]})
+            for field, (stream_id, record_key, row_key, row_field) in ENRICHED_FIELDS.items()
+        }
+
+    @staticmethod
+    def extend_schema(schema: JsonResult) -> JsonResult:
+        """Returns a copy of schema with the enriched fields added."""
+        properties = dict(schema.get("properties", {}))
+        properties.update({field: {"type": ["null", "string"]} for field in ENRICHED_FIELDS})
+        return dict(schema, properties=properties)
+
+    def enrich(self, records: List[JsonResult]) -> None:
+        """Adds the enriched fields to records in place."""
+        for field, (record_key, lookup) in self.lookups.items():
+            for record in records:
+                record[field] = lookup.get(record.get(record_key))
+
+
+def _dimension_stream_ids() -> List[str]:
+    return sorted({stream_id for stream_id, _, _, _ in ENRICHED_FIELDS.values()})
+
+
+def load_record_enricher(client: Client) -> RecordEnricher:
+    dimensions = {}
+    for stream_id in _dimension_stream_ids():
+        LOGGER.info("Loading %s to enrich records", stream_id)
+        pages = streams.get(stream_id)().get_records(client, {}, "", None, None)
+        dimensions[stream_id] = [row for page in pages for row in page]
+    return RecordEnricher(dimensions)
+
+
+async def load_record_enricher_async(client: "AsyncClient") -> RecordEnricher:
+    dimensions = {}
+    for stream_id in _dimension_stream_ids():
+        LOGGER.info("Loading %s to enrich records", stream_id)
+        dimensions[stream_id] = [
+            row async for page in streams.get(stream_id)().get_records_async(client, {}, "", None, None) for row in page
+        ]
+    return RecordEnricher(dimensions)
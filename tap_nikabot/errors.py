@@ -20,3 +20,8 @@ class InvalidReplicationMethodError(Exception):
 class StartDateAfterEndDateError(Exception):
     def __init__(self, start_date: date, end_date: date):
         super().__init__(f"Start date '{start_date}' cannot be later than end date '{end_date}'")
+
+
+class SwaggerNotCachedError(Exception):
+    def __init__(self, path: str):
+        super().__init__(f"Offline mode requires a cached swagger definition but '{path}' does not exist")
@@ -0,0 +1,59 @@
+"""JSON encoding and decoding using the fastest available backend.
+
+orjson is used for decoding and encoding when installed, otherwise ujson is used for decoding. ujson's encoder
+converts Decimal values to float so it isn't used for encoding. Anything a fast backend can't handle identically
+falls back to the standard library (for decoding) or singer's simplejson encoding (for messages).
+
+Messages encoded with orjson parse to the same values as singer's, but aren't formatted the same: there are no spaces
+after separators, non-ASCII characters aren't escaped, and NaN and infinite floats are encoded as null rather than
+as NaN and Infinity, which aren't valid JSON.
+"""
+import json
+from typing import Any, Union
+
+import singer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+try:
+    import ujson  # type: ignore
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+def backend() -> str:
+    if orjson is not None:
+        return "orjson"
+    if ujson is not None:
+        return "ujson"
+    return "json"
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # e.g. integers too large for orjson, let the standard library decide
+            pass
+    elif ujson is not None:
+        try:
+            return ujson.loads(data)
+        except ValueError:
+            pass
+    return json.loads(data)
+
+
+def format_message(message: singer.Message) -> str:
+    """Serializes a Singer message, equivalent to singer.format_message."""
+    if orjson is not None:
+        try:
+            # Datetimes are passed through so they fail to serialize the same as they would with simplejson
+            return orjson.dumps(message.asdict(), option=orjson.OPT_PASSTHROUGH_DATETIME).decode("utf-8")
+        except TypeError:
+            # Decimal values and integers too large for orjson are serialized exactly by simplejson
+            pass
+    return str(singer.format_message(message))
@@ -0,0 +1,124 @@
+import codecs
+import json
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+)
+
+from .errors import ServerError
+from .typing import JsonResult
+
+_WHITESPACE = " \t\n\r"
+# Discard consumed text from the buffer once this many characters have been parsed
+_COMPACT_AFTER = 1024 * 1024
+
+
+class _Parser:
+    """Incrementally parses JSON text from an iterable of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._exhausted = False
+
+    def _read(self) -> bool:
+        if self._exhausted:
+            return False
+        if self._pos > _COMPACT_AFTER:
+            self._buffer = self._buffer[self._pos :]
+            self._pos = 0
+        try:
+            self._buffer += self._decoder.decode(next(self._chunks))
+        except StopIteration:
+            self._buffer += self._decoder.decode(b"", final=True)
+            self._exhausted = True
+        return True
+
+    def next_char(self) -> str:
+        """Skips whitespace and returns the next character without consuming it."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                raise ValueError("Unexpected end of JSON response")
+
+    def expect(self, chars: str) -> str:
+        char = self.next_char()
+        if char not in chars:
+            raise ValueError(f"Expected one of '{chars}' at position {self._pos} but found '{char}'")
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        self.next_char()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._exhausted:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._exhausted:
+                    raise
+            self._read()
+
+
+def _parse_envelope(parser: _Parser) -> Iterator[Tuple[str, Any]]:
+    """Yields the key and value of each property of the response object.
+
+    The value for "result" is a generator of its items which must be consumed before continuing.
+    """
+    parser.expect("{")
+    if parser.next_char() == "}":
+        return
+    while True:
+        key = parser.value()
+        parser.expect(":")
+        if key == "result" and parser.next_char() == "[":
+            yield key, _parse_array(parser)
+        else:
+            yield key, parser.value()
+        if parser.expect(",}") == "}":
+            return
+
+
+def _parse_array(parser: _Parser) -> Iterator[Any]:
+    parser.expect("[")
+    if parser.next_char() == "]":
+        parser.expect("]")
+        return
+    while True:
+        yield parser.value()
+        if parser.expect(",]") == "]":
+            return
+
+
+def iter_result(chunks: Iterable[bytes], batch_size: int) -> Iterator[List[JsonResult]]:
+    """Parses a Nikabot API response, yielding the items of its "result" array in batches as they're decoded."""
+    envelope: Dict[str, Any] = {}
+    for key, value in _parse_envelope(_Parser(chunks)):
+        if key != "result" or not isinstance(value, Iterator):
+            envelope[key] = value
+            continue
+        if "ok" in envelope and not envelope["ok"]:
+            raise ServerError(envelope.get("message"))
+        batch: List[JsonResult] = []
+        for item in value:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    if not envelope.get("ok", False):
+        raise ServerError(envelope.get("message"))
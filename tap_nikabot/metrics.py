@@ -0,0 +1,202 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+    cast,
+)
+
+import singer
+from singer.metrics import Metric, Point, Tag
+
+LOGGER = singer.get_logger()
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Phases whose time is totalled in each stream's metrics
+RATE_LIMIT = "rate_limit"
+BACKOFF = "backoff"
+DECODE = "decode"
+TRANSFORM = "transform"
+WRITE = "write"
+PHASES = (RATE_LIMIT, BACKOFF, DECODE, TRANSFORM, WRITE)
+_T = TypeVar("_T")
+
+# The metrics of the stream each thread is syncing
+_local = threading.local()
+
+
+class StreamMetrics:
+    """Counts requests, retries, bytes and records and totals time spent in each phase of syncing one stream.
+
+    The stream's metrics are collected from whichever thread they are activated in, including worker threads
+    started with run_in_context. Coroutines share a thread, so they're given metrics explicitly instead.
+    """
+
+    def __init__(self, stream_id: str) -> None:
+        self.stream_id = stream_id
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.records = 0
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.latencies: List[float] = []
+        self.phase_seconds: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+        self._lock = threading.Lock()
+
+    def add_request(self, seconds: float, content_bytes: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes += content_bytes
+            self.latencies.append(seconds)
+
+    def add_retry(self, backoff_seconds: float) -> None:
+        with self._lock:
+            self.retries += 1
+            self.phase_seconds[BACKOFF] += backoff_seconds
+
+    def add_bytes(self, content_bytes: int) -> None:
+        with self._lock:
+            self.bytes += content_bytes
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phase_seconds[phase] += seconds
+
+    def add_records(self, count: int) -> None:
+        with self._lock:
+            self.records += count
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def latency_histogram(self) -> Dict[str, int]:
+        """Number of requests by latency bucket, keyed by the bucket's upper bound in seconds."""
+        histogram = {str(bound): 0 for bound in LATENCY_BUCKETS}
+        histogram["+Inf"] = 0
+        for latency in self.latencies:
+            bucket = next((str(bound) for bound in LATENCY_BUCKETS if latency <= bound), "+Inf")
+            histogram[bucket] += 1
+        return histogram
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+    def points(self) -> List[Point]:
+        """The stream's metrics as Singer metric points."""
+        tags = {Tag.endpoint: self.stream_id}
+        duration = self.duration
+        points = [
+            Point("counter", Metric.record_count, self.records, tags),
+            Point("counter", "request_count", self.requests, tags),
+            Point("counter", "retry_count", self.retries, tags),
+            Point("counter", "bytes_downloaded", self.bytes, tags),
+            Point("timer", Metric.job_duration, duration, dict(tags, **{Tag.job_type: "sync_stream"})),
+            Point("gauge", "records_per_second", self.records / duration if duration > 0 else 0.0, tags),
+            Point(
+                "histogram",
+                Metric.http_request_duration,
+                {
+                    "count": len(self.latencies),
+                    "sum": sum(self.latencies),
+                    "p50": self.percentile(50),
+                    "p95": self.percentile(95),
+                    "max": max(self.latencies, default=0.0),
+                    "buckets": self.latency_histogram(),
+                },
+                tags,
+            ),
+        ]
+        points.extend(Point("timer", f"{phase}_duration", self.phase_seconds[phase], tags) for phase in PHASES)
+        return points
+
+    def summary(self) -> str:
+        duration = self.duration
+        phases = ", ".join(f"{phase} {self.phase_seconds[phase]:.3f}s" for phase in PHASES)
+        return (
+            f"{self.stream_id}: {self.records} records in {duration:.3f}s "
+            f"({self.records / duration if duration > 0 else 0.0:.0f} records/sec), "
+            f"{self.requests} requests, {self.retries} retries, {self.bytes} bytes, "
+            f"latency p50 {self.percentile(50):.3f}s p95 {self.percentile(95):.3f}s; {phases}"
+        )
+
+
+def current() -> Optional[StreamMetrics]:
+    """The metrics of the stream being synced on this thread, or None when metrics are disabled."""
+    return cast(Optional[StreamMetrics], getattr(_local, "stream_metrics", None))
+
+
+@contextmanager
+def activated(stream_metrics: Optional[StreamMetrics]) -> Iterator[None]:
+    """Collects the metrics of the stream being synced on this thread in stream_metrics until exited."""
+    previous = current()
+    _local.stream_metrics = stream_metrics
+    try:
+        yield
+    finally:
+        _local.stream_metrics = previous
+
+
+def add_time(phase: str, seconds: float) -> None:
+    stream_metrics = current()
+    if stream_metrics is not None:
+        stream_metrics.add_time(phase, seconds)
+
+
+def add_request(seconds: float, content_bytes: int) -> None:
+    stream_metrics = current()
+    if stream_metrics is not None:
+        stream_metrics.add_request(seconds, content_bytes)
+
+
+def add_retry(backoff_seconds: float) -> None:
+    stream_metrics = current()
+    if stream_metrics is not None:
+        stream_metrics.add_retry(backoff_seconds)
+
+
+def count_bytes(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Passes chunks of a response through, adding their size to the bytes downloaded."""
+    stream_metrics = current()
+    for chunk in chunks:
+        if stream_metrics is not None:
+            stream_metrics.add_bytes(len(chunk))
+        yield chunk
+
+
+def run_in_context(func: Callable[..., _T]) -> Callable[..., _T]:
+    """Wraps func to collect the metrics active on this thread, so worker threads collect the same stream's metrics."""
+    stream_metrics = current()
+
+    def run(*args: Any, **kwargs: Any) -> _T:
+        with activated(stream_metrics):
+            return func(*args, **kwargs)
+
+    return run
+
+
+def log_metrics(stream_metrics: StreamMetrics) -> None:
+    for point in stream_metrics.points():
+        singer.metrics.log(LOGGER, point)
+
+
+def log_summary(all_metrics: List[StreamMetrics]) -> None:
+    if not all_metrics:
+        return
+    LOGGER.info("Sync summary:")
+    for stream_metrics in all_metrics:
+        LOGGER.info("  %s", stream_metrics.summary())
@@ -0,0 +1,52 @@
+from typing import Optional
+
+import singer
+
+LOGGER = singer.get_logger()
+# Relative drop in throughput which is considered worse rather than noise
+THROUGHPUT_TOLERANCE = 0.1
+
+
+class AdaptivePageSize:
+    """Tunes the page size between bounds to maximise rows per second.
+
+    The API pages by page number and limit, i.e. a page starts at page * limit. The page size is only changed to a
+    size that evenly divides the number of rows already read so the next page starts exactly where the last ended.
+    """
+
+    def __init__(self, page_size: int, min_page_size: int, max_page_size: int) -> None:
+        self.min_page_size = min_page_size
+        self.max_page_size = max_page_size
+        self.page_size = min(max(page_size, min_page_size), max_page_size)
+        self._direction = 1
+        self._last_throughput: Optional[float] = None
+
+    def page_for_offset(self, offset: int) -> int:
+        return offset // self.page_size
+
+    def update(self, offset: int, rows: int, seconds: float, content_bytes: int) -> None:
+        """Records the result of fetching a page, offset is the number of rows read including this page."""
+        if rows < self.page_size:
+            # Last page, no point tuning
+            return
+        throughput = rows / seconds if seconds > 0 else float("inf")
+        if self._last_throughput is not None and throughput < self._last_throughput * (1 - THROUGHPUT_TOLERANCE):
+            self._direction = -self._direction
+        self._last_throughput = throughput
+
+        if self._direction > 0:
+            candidate = min(self.page_size * 2, self.max_page_size)
+        else:
+            candidate = max(self.page_size // 2, self.min_page_size)
+        if candidate == self.page_size or offset % candidate != 0:
+            return
+        LOGGER.info(
+            "Changing page size from %s to %s, last page %s rows in %.3fs (%.0f rows/sec, %s bytes)",
+            self.page_size,
+            candidate,
+            rows,
+            seconds,
+            throughput,
+            content_bytes,
+        )
+        self.page_size = candidate
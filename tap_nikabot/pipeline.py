@@ -0,0 +1,145 @@
+import queue
+import threading
+from typing import (
+    Any,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+from . import metrics
+
+_T = TypeVar("_T")
+_P = TypeVar("_P")
+# Seconds a blocked stage waits before checking whether the pipeline has stopped
+_POLL_INTERVAL = 0.1
+_END = object()
+
+
+class ByteBudget:
+    """Limits the bytes held in pipelines, blocking producers until consumers have released enough.
+
+    One budget can be shared by the pipelines of every stream in a sync to bound the memory used by all of them. An
+    item larger than the whole limit is let through when nothing else is held, so it can't block forever. The most
+    bytes held at once is recorded in peak.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int, stop: Optional[threading.Event] = None) -> bool:
+        """Waits until size bytes are available and takes them, returning False if stop is set while waiting."""
+        with self._condition:
+            while self.used > 0 and self.used + size > self.limit:
+                if stop is not None and stop.is_set():
+                    return False
+                self._condition.wait(_POLL_INTERVAL)
+            self.used += size
+            self.peak = max(self.peak, self.used)
+            return True
+
+    def release(self, size: int) -> None:
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+def run_pipeline(
+    source: Iterator[_T],
+    prepare: Callable[[_T], Optional[_P]],
+    write: Callable[[_P], None],
+    size: Callable[[_P], int],
+    budget: ByteBudget,
+    queue_size: int = 2,
+) -> None:
+    """Fetches items from source, prepares them and writes them, each stage running at the same time in order.
+
+    Source is iterated on one thread and each item is prepared on another, while prepared items are written on the
+    calling thread. The queues between the stages hold up to queue_size items, and prepared items also take their
+    size from budget until they're written. So when writing is slow, preparing and then fetching wait for it rather
+    than buffering without limit. Items prepared as None are skipped. An exception in any stage stops the pipeline
+    and is raised here.
+    """
+    stop = threading.Event()
+    fetched: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+    prepared: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+
+    def put(stage_queue: "queue.Queue[Any]", item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                stage_queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(stage_queue: "queue.Queue[Any]") -> Any:
+        while not stop.is_set():
+            try:
+                return stage_queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _END
+
+    def fetch() -> None:
+        try:
+            for item in source:
+                if not put(fetched, item):
+                    return
+            put(fetched, _END)
+        except BaseException as ex:  # pylint: disable=broad-except
+            put(fetched, ex)
+        finally:
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+
+    def transform() -> None:
+        try:
+            while True:
+                item = get(fetched)
+                if item is _END or isinstance(item, BaseException):
+                    put(prepared, item)
+                    return
+                result = prepare(item)
+                if result is None:
+                    continue
+                if not budget.acquire(size(result), stop):
+                    return
+                if not put(prepared, result):
+                    budget.release(size(result))
+                    return
+        except BaseException as ex:  # pylint: disable=broad-except
+            put(prepared, ex)
+
+    # Both stages record their work in the metrics of the stream being synced
+    threads: List[threading.Thread] = [
+        threading.Thread(target=metrics.run_in_context(stage), daemon=True) for stage in (fetch, transform)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            item = prepared.get()
+            if item is _END:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            try:
+                write(item)
+            finally:
+                budget.release(size(item))
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        # Release the budget held by items which won't be written, so other pipelines sharing it can continue
+        while not prepared.empty():
+            item = prepared.get_nowait()
+            if item is not _END and not isinstance(item, BaseException):
+                budget.release(size(item))
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+# Bucket state is the number of tokens available and the time it was last updated
+_State = Tuple[float, float]
+# Requests which can be made at once by default, small so the steady rate is close to the limit
+DEFAULT_BURST = 10
+_STATE_FORMAT = "dd"
+
+
+class Backend(ABC):
+    """Stores the state of a TokenBucket so it can be shared between threads or processes."""
+
+    @abstractmethod
+    def update(self, func: Callable[[Optional[_State]], _State]) -> _State:
+        """Atomically replaces the stored state with func(state), state is None before the first update."""
+        raise NotImplementedError
+
+
+class MemoryBackend(Backend):
+    """Shares a bucket between threads in one process."""
+
+    def __init__(self) -> None:
+        self._state: Optional[_State] = None
+        self._lock = threading.Lock()
+
+    def update(self, func: Callable[[Optional[_State]], _State]) -> _State:
+        with self._lock:
+            self._state = func(self._state)
+            return self._state
+
+
+class FileBackend(Backend):
+    """Shares a bucket between processes on one host, the state is kept in a small file guarded by flock."""
+
+    def __init__(self, path: str) -> None:
+        if fcntl is None:
+            raise RuntimeError("The file rate limit backend is not supported on this platform")
+        self.path = path
+
+    def update(self, func: Callable[[Optional[_State]], _State]) -> _State:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            data = os.pread(fd, struct.calcsize(_STATE_FORMAT), 0)
+            state: Optional[_State] = None
+            if len(data) == struct.calcsize(_STATE_FORMAT):
+                state = struct.unpack(_STATE_FORMAT, data)
+            new_state = func(state)
+            os.pwrite(fd, struct.pack(_STATE_FORMAT, *new_state), 0)
+            return new_state
+        finally:
+            # Closing the file releases the lock
+            os.close(fd)
+
+
+def default_lock_file(access_token: str) -> str:
+    """Path of the file shared by every tap on this host using the same access token."""
+    digest = hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"tap-nikabot-ratelimit-{digest}")
+
+
+class TokenBucket:
+    """Allows at most limit requests in any period seconds, with bursts of up to burst requests.
+
+    A full bucket can be used on top of the tokens refilled during a period, so the bucket refills at limit - burst
+    tokens a period to stay within limit. The larger the burst, the lower the steady rate. The default burst is
+    DEFAULT_BURST, or half of limit when that's smaller.
+
+    Tokens are reserved rather than waited for under a lock, so concurrent callers are given increasing wait times
+    and sleep at the same time instead of queueing behind each other. The time spent waiting is totalled in
+    wait_seconds.
+    """
+
+    def __init__(
+        self, limit: float, period: float, burst: Optional[int] = None, backend: Optional[Backend] = None
+    ) -> None:
+        self.burst = float(burst) if burst is not None else min(float(DEFAULT_BURST), limit / 2)
+        if not 0 < self.burst < limit:
+            raise ValueError(f"Rate limit burst must be greater than 0 and less than the limit of {limit:g}")
+        self.rate = (limit - self.burst) / period
+        self.backend = backend or MemoryBackend()
+        self.wait_seconds = 0.0
+        self.waits = 0
+        self._stats_lock = threading.Lock()
+
+    def reserve(self, tokens: int = 1) -> float:
+        """Takes tokens from the bucket, returning the number of seconds to wait before using them."""
+        now = time.time()
+
+        def take(state: Optional[_State]) -> _State:
+            available, updated = state if state is not None else (self.burst, now)
+            # A clock that went backwards (or another host's skew) must not add tokens
+            available = min(self.burst, available + max(0.0, now - updated) * self.rate)
+            return available - tokens, max(now, updated)
+
+        available, _ = self.backend.update(take)
+        # A negative balance is owed by this caller, it's repaid at the fill rate
+        wait = -available / self.rate if available < 0 else 0.0
+        if wait > 0:
+            with self._stats_lock:
+                self.wait_seconds += wait
+                self.waits += 1
+        return wait
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Blocks until tokens are available, returning the time waited."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 1) -> float:
+        """Waits on the event loop until tokens are available, returning the time waited."""
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
@@ -0,0 +1,108 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Mapping, Optional, TypeVar
+
+import requests
+import singer
+
+from . import metrics
+from .metrics import StreamMetrics
+
+LOGGER = singer.get_logger()
+TOO_MANY_REQUESTS = 429
+_T = TypeVar("_T")
+# Errors sending a request or reading its response which may not happen again
+_TRANSIENT_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Returns the seconds to wait from a Retry-After header, which is either a number of seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """Decides whether and how long to wait before retrying a failed request.
+
+    Only 429 and 5xx responses, connection errors, timeouts and truncated responses are retried, other client errors fail straight away.
+    A Retry-After header is waited for as given, otherwise the wait is a random time up to an exponentially
+    increasing cap ("full jitter") so concurrent clients don't retry in lockstep. The number of retries and total
+    time spent backing off are counted in retries and backoff_seconds.
+    """
+
+    def __init__(self, max_tries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0) -> None:
+        self.max_tries = max_tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def delay(self, attempt: int, status_code: Optional[int], headers: Mapping[str, str]) -> Optional[float]:
+        """Returns the seconds to wait after a failed attempt, or None if it shouldn't be retried.
+
+        status_code is None for a connection error or timeout.
+        """
+        if attempt >= self.max_tries:
+            return None
+        if status_code is not None and status_code != TOO_MANY_REQUESTS and status_code < 500:
+            return None
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def delay_for_error(self, attempt: int, error: Exception) -> Optional[float]:
+        if isinstance(error, _TRANSIENT_ERRORS):
+            return self.delay(attempt, None, {})
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            return self.delay(attempt, error.response.status_code, error.response.headers)
+        return None
+
+    def record(self, delay: float, error: Exception, stream_metrics: Optional[StreamMetrics] = None) -> None:
+        """Counts a retry in stream_metrics, or the metrics active on this thread."""
+        LOGGER.info("Backing off %.1f seconds after %s", delay, error)
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+        if stream_metrics is not None:
+            stream_metrics.add_retry(delay)
+        else:
+            metrics.add_retry(delay)
+
+    def backoff(self, attempt: int, error: Exception) -> bool:
+        """Waits before retrying a failed attempt, returns False if it shouldn't be retried."""
+        delay = self.delay_for_error(attempt, error)
+        if delay is None:
+            return False
+        self.record(delay, error)
+        time.sleep(delay)
+        return True
+
+    def call(self, func: Callable[[], _T]) -> _T:
+        """Calls func, retrying requests errors as the policy allows."""
+        attempt = 1
+        while True:
+            try:
+                return func()
+            except requests.exceptions.RequestException as error:
+                if not self.backoff(attempt, error):
+                    raise
+                attempt += 1
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+import singer
+
+from . import jsonlib
+from .typing import JsonResult
+
+LOGGER = singer.get_logger()
+DEFINITIONS_PREFIX = "#/definitions/"
+# The last swagger document compiled by this process, by document hash and cache directory
+_compiled: Dict[Tuple[str, Optional[str]], "SwaggerSchemas"] = {}
+
+
+def document_hash(swagger: JsonResult) -> str:
+    return hashlib.sha256(json.dumps(swagger, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class SwaggerSchemas:
+    """The definitions of a swagger document, with $ref references resolved on demand.
+
+    Each definition is resolved once and reused by every schema referring to it, so the returned schemas share
+    nested dicts and must be treated as read only. Resolving a definition gives the same schema as
+    singer.resolve_schema_references without modifying the swagger document.
+    """
+
+    def __init__(
+        self, swagger: JsonResult, resolved: Optional[Dict[str, JsonResult]] = None, digest: Optional[str] = None
+    ) -> None:
+        self.digest = digest or document_hash(swagger)
+        self.definitions: Dict[str, JsonResult] = swagger["definitions"]
+        self.resolved_definitions: Dict[str, JsonResult] = dict(resolved or {})
+        # Number of the resolved definitions already saved by save_swagger_schemas
+        self.saved_count = len(self.resolved_definitions)
+
+    def definition(self, name: str) -> JsonResult:
+        return self.definitions[name]
+
+    def resolved(self, name: str) -> JsonResult:
+        if name not in self.resolved_definitions:
+            self.resolved_definitions[name] = self.resolve(self.definitions[name])
+        return self.resolved_definitions[name]
+
+    def resolve(self, schema: JsonResult) -> JsonResult:
+        if "$ref" in schema:
+            ref = schema["$ref"]
+            if not ref.startswith(DEFINITIONS_PREFIX):
+                raise ValueError(f"Unsupported schema reference '{ref}'")
+            # Keys of the referenced definition replace those alongside the $ref
+            merged = self.resolve({k: v for k, v in schema.items() if k != "$ref"})
+            merged.update(self.resolved(ref[len(DEFINITIONS_PREFIX) :]))
+            return merged
+
+        result = dict(schema)
+        for key in ("properties", "patternProperties"):
+            if key in schema:
+                result[key] = {k: self.resolve(v) for k, v in schema[key].items()}
+        if "items" in schema:
+            result["items"] = self.resolve(schema["items"])
+        if "anyOf" in schema:
+            result["anyOf"] = [self.resolve(s) for s in schema["anyOf"]]
+        return result
+
+
+def compile_swagger(swagger: JsonResult, cache_dir: Optional[str] = None) -> SwaggerSchemas:
+    """Returns the schemas of a swagger document, reusing definitions resolved earlier for the same document.
+
+    Definitions are remembered for the life of the process, and between runs in cache_dir when given.
+    """
+    digest = document_hash(swagger)
+    key = (digest, cache_dir)
+    if key in _compiled:
+        return _compiled[key]
+    resolved = _read_resolved(cache_dir, digest) if cache_dir else None
+    schemas = SwaggerSchemas(swagger, resolved, digest)
+    _compiled.clear()
+    _compiled[key] = schemas
+    return schemas
+
+
+def save_swagger_schemas(schemas: SwaggerSchemas, cache_dir: str) -> None:
+    """Stores the definitions resolved so far for compile_swagger in later runs."""
+    entry = {"hash": schemas.digest, "definitions": schemas.resolved_definitions}
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=cache_dir, prefix=".schemas-")
+    try:
+        with os.fdopen(fd, "w") as cache_file:
+            json.dump(entry, cache_file)
+        os.replace(temp_path, os.path.join(cache_dir, "schemas.json"))
+        schemas.saved_count = len(schemas.resolved_definitions)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _read_resolved(cache_dir: str, digest: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(cache_dir, "schemas.json"), "rb") as cache_file:
+            entry = jsonlib.loads(cache_file.read())
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        LOGGER.warning("Ignoring invalid schema cache in %s", cache_dir)
+        return None
+    if entry.get("hash") != digest:
+        return None
+    return dict(entry["definitions"])
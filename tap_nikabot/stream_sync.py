@@ -0,0 +1,348 @@
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from types import TracebackType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+)
+
+import singer
+from singer import metadata
+from singer.catalog import CatalogEntry
+
+from . import metrics, streams
+from .bookmarks import BookmarkTracker
+from .changes import HASHES_KEY, ChangeIndex, HashIndexFile
+from .client import Client
+from .enrichment import RecordEnricher
+from .metrics import StreamMetrics
+from .pipeline import ByteBudget, run_pipeline
+from .replication_method import ReplicationMethod
+from .transform import RecordTransformer
+from .transform_pool import StreamSchema, TransformedPage, TransformPool
+from .typing import JsonResult
+from .writer import MessageWriter, format_line
+
+if TYPE_CHECKING:
+    from .async_client import AsyncClient
+
+LOGGER = singer.get_logger()
+# State key of the position each interrupted stream can resume from
+CHECKPOINTS_KEY = "checkpoints"
+
+
+def stream_schema(
+    config: Dict[str, Any], selected_stream: CatalogEntry, enricher: Optional[RecordEnricher] = None
+) -> StreamSchema:
+    """The schema the selected stream's records are written with, and its metadata map."""
+    stream = streams.get(selected_stream.tap_stream_id)
+    schema = selected_stream.schema.to_dict()
+    if enricher is not None and stream.enrichable:
+        schema = enricher.extend_schema(schema)
+    if config.get("change_detection") and stream.change_detection:
+        schema = ChangeIndex.extend_schema(schema)
+    return schema, metadata.to_map(selected_stream.metadata)
+
+
+class PreparedRecords(NamedTuple):
+    """A page of records transformed and formatted as RECORD messages, ready to write."""
+
+    lines: List[str]
+    # Number of records in the page, some may not be output with change detection
+    record_count: int
+    # The last bookmark in the page if the stream is sorted by its bookmark, otherwise a tracker of the largest
+    bookmark: Any
+    # The source's position after the page
+    position: Optional[JsonResult]
+    # Number of characters in lines
+    size: int
+
+
+class StreamSync:
+    """Writes the messages for one selected stream: its schema, transformed records and bookmarks.
+
+    Used as a context manager around fetching the stream's records, the SCHEMA message is written on entry and the
+    final bookmark on a successful exit. STATE messages contain the bookmarks of every stream in new_state, which
+    is shared by all streams in a sync. With a checkpoint_interval the position of resumable streams is also written
+    every checkpoint_interval pages, and removed once the stream completes. With an enricher the records of enrichable
+    streams are enriched before they're transformed. With change_detection only the new and changed rows of full table
+    streams are written, followed by tombstones for deleted rows when the stream completes.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        state: Dict[str, Any],
+        selected_stream: CatalogEntry,
+        writer: MessageWriter,
+        new_state: Optional[Dict[str, Any]] = None,
+        enricher: Optional[RecordEnricher] = None,
+    ) -> None:
+        self.config = config
+        self.selected_stream = selected_stream
+        self.stream_id: str = selected_stream.tap_stream_id
+        self.writer = writer
+        self.new_state = new_state if new_state is not None else dict(state)
+        self.stream = streams.get(self.stream_id)
+        self.bookmark_column = selected_stream.replication_key
+        self.replication_method = (
+            ReplicationMethod[selected_stream.replication_method] if selected_stream.replication_method else None
+        )
+        # Only incremental syncs start from a bookmark, so full table syncs don't write one
+        self.writes_bookmark = bool(self.bookmark_column) and self.replication_method == ReplicationMethod.INCREMENTAL
+        self.last_bookmark = state.get(self.stream_id)
+        self.max_bookmark = BookmarkTracker(
+            self.last_bookmark if self.replication_method == ReplicationMethod.INCREMENTAL else None
+        )
+        self.source = self.stream()
+        self.enricher = enricher if self.source.enrichable else None
+        self.metrics = StreamMetrics(self.stream_id) if config.get("metrics") else None
+        self.checkpoint_interval = int(config.get("checkpoint_interval", 0))
+        self.pages_since_checkpoint = 0
+        checkpoint = state.get(CHECKPOINTS_KEY, {}).get(self.stream_id)
+        if checkpoint and self.source.resumable:
+            self.source.resume_from = checkpoint
+            # Rows already output may have held the highest bookmark
+            if self.replication_method == ReplicationMethod.INCREMENTAL:
+                self.max_bookmark.update(checkpoint.get("max_bookmark"))
+        self.hash_index_file = HashIndexFile(config["change_index_dir"]) if config.get("change_index_dir") else None
+        self.changes: Optional[ChangeIndex] = None
+        if config.get("change_detection") and self.source.change_detection:
+            if self.hash_index_file is not None:
+                previous = self.hash_index_file.read(self.stream_id)
+            else:
+                previous = state.get(HASHES_KEY, {}).get(self.stream_id)
+            self.changes = ChangeIndex(self.source.key_properties[0], previous)
+        # Build the schema and metadata once per stream rather than once per record
+        self.schema, self.metadata_map = stream_schema(config, selected_stream, self.enricher)
+        self.transformer = RecordTransformer(self.schema, self.metadata_map)
+
+    def __enter__(self) -> "StreamSync":
+        LOGGER.info("Syncing stream: %s", self.stream_id)
+        self.writer.write_schema(
+            stream_name=self.stream_id,
+            schema=self.schema,
+            key_properties=self.selected_stream.key_properties,
+            bookmark_properties=[self.bookmark_column] if self.bookmark_column else None,
+        )
+        self.transformer.__enter__()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.transformer.__exit__(exc_type, exc_val, exc_tb)
+        if self.metrics is not None:
+            self.metrics.finish()
+            metrics.log_metrics(self.metrics)
+        if exc_type is not None:
+            return
+        with self.writer.lock:
+            if self.changes is not None:
+                self.write_changes(self.changes)
+            checkpoint_cleared = self._set_checkpoint(None)
+            if self.writes_bookmark and not self.stream.replication_key_is_sorted:
+                self.write_bookmark(self.max_bookmark.value)
+            elif checkpoint_cleared:
+                self.writer.write_state(dict(self.new_state))
+
+    def get_records(self, client: Client) -> Iterator[List[JsonResult]]:
+        return self.source.get_records(
+            client, self.config, self.bookmark_column, self.last_bookmark, self.replication_method
+        )
+
+    def get_records_async(self, client: "AsyncClient") -> AsyncIterator[List[JsonResult]]:
+        return self.source.get_records_async(
+            client, self.config, self.bookmark_column, self.last_bookmark, self.replication_method
+        )
+
+    def write_records(self, records: List[JsonResult]) -> None:
+        prepared = self.prepare_records(records, self.source.position)
+        if prepared is not None:
+            self.write_prepared(prepared)
+
+    def sync_records(
+        self,
+        client: Client,
+        budget: Optional[ByteBudget] = None,
+        queue_size: int = 2,
+        pool: Optional[TransformPool] = None,
+    ) -> None:
+        """Fetches and writes all of the stream's records.
+
+        With a budget fetching, preparing and writing run at the same time in a pipeline holding at most budget
+        bytes. With a pool records are prepared on its worker processes.
+        """
+        # The position is taken as each page is fetched, as the source will be further ahead by the time it's written
+        pages = ((page, self.source.position) for page in self.get_records(client))
+        if budget is not None:
+            if pool is not None:
+                # The pool's processes are the prepare stage, so pages are sent to them as they're fetched
+                run_pipeline(self.prepare_in_pool(pool, pages), _same, self.write_prepared, _size, budget, queue_size)
+            else:
+                run_pipeline(pages, self.prepare_page, self.write_prepared, _size, budget, queue_size)
+            return
+        prepared_pages = self.prepare_in_pool(pool, pages) if pool is not None else map(self.prepare_page, pages)
+        for prepared in prepared_pages:
+            if prepared is not None:
+                self.write_prepared(prepared)
+
+    def prepare_page(self, page: Tuple[List[JsonResult], Optional[JsonResult]]) -> Optional[PreparedRecords]:
+        return self.prepare_records(*page)
+
+    def prepare_in_pool(
+        self, pool: TransformPool, pages: Iterator[Tuple[List[JsonResult], Optional[JsonResult]]]
+    ) -> Iterator[PreparedRecords]:
+        """Prepares pages on the pool's processes, yielding them in page order."""
+        pending: Deque[Tuple["Future[TransformedPage]", int, Any, Optional[JsonResult]]] = deque()
+        key_property = self.changes.key_property if self.changes is not None else None
+        try:
+            for records, position in pages:
+                if len(records) == 0:
+                    continue
+                if self.enricher is not None:
+                    self.enricher.enrich(records)
+                future = pool.submit(self.stream_id, records, datetime.now(timezone.utc), key_property)
+                pending.append((future, len(records), self._page_bookmark(records), position))
+                if len(pending) >= pool.max_pending:
+                    yield self._pooled_result(*pending.popleft())
+            while pending:
+                yield self._pooled_result(*pending.popleft())
+        finally:
+            for future, _, _, _ in pending:
+                future.cancel()
+
+    def _pooled_result(
+        self, future: "Future[TransformedPage]", record_count: int, bookmark: Any, position: Optional[JsonResult]
+    ) -> PreparedRecords:
+        start = time.perf_counter()
+        lines, digests = future.result()
+        if self.changes is not None and digests is not None:
+            changes = self.changes
+            lines = [line for line, (key, digest) in zip(lines, digests) if changes.changed_digest(key, digest)]
+        if self.metrics is not None:
+            # Only the time spent waiting for the pool holds up the sync
+            self.metrics.add_time(metrics.TRANSFORM, time.perf_counter() - start)
+        return PreparedRecords(lines, record_count, bookmark, position, sum(len(line) for line in lines))
+
+    def prepare_records(self, records: List[JsonResult], position: Optional[JsonResult]) -> Optional[PreparedRecords]:
+        """Transforms and formats a page of records, returning None for an empty page."""
+        if len(records) == 0:
+            return None
+        start = time.perf_counter()
+        if self.enricher is not None:
+            self.enricher.enrich(records)
+        transformed = [self.transformer.transform_record(record) for record in records]
+        if self.changes is not None:
+            transformed = [record for record in transformed if self.changes.changed(record)]
+        transformed_at = time.perf_counter()
+        time_extracted = datetime.now(timezone.utc)
+        lines = [
+            format_line(singer.RecordMessage(self.stream_id, record, time_extracted=time_extracted))
+            for record in transformed
+        ]
+        if self.metrics is not None:
+            self.metrics.add_time(metrics.TRANSFORM, transformed_at - start)
+            self.metrics.add_time(metrics.WRITE, time.perf_counter() - transformed_at)
+        return PreparedRecords(
+            lines, len(records), self._page_bookmark(records), position, sum(len(line) for line in lines)
+        )
+
+    def _page_bookmark(self, records: List[JsonResult]) -> Any:
+        if not self.writes_bookmark:
+            return None
+        if self.stream.replication_key_is_sorted:
+            return records[-1][self.bookmark_column]
+        page_bookmark = BookmarkTracker()
+        page_bookmark.update_rows(records, self.bookmark_column)
+        return page_bookmark
+
+    def write_prepared(self, prepared: PreparedRecords) -> None:
+        start = time.perf_counter()
+        # write one or more rows to the stream:
+        self.writer.write_lines(prepared.lines)
+        if self.metrics is not None:
+            self.metrics.add_time(metrics.WRITE, time.perf_counter() - start)
+            self.metrics.add_records(prepared.record_count)
+        if self.writes_bookmark:
+            if self.stream.replication_key_is_sorted:
+                # update bookmark to latest value
+                self.write_bookmark(prepared.bookmark)
+            else:
+                # if data unsorted, save max value until end of writes
+                self.max_bookmark.merge(prepared.bookmark)
+        self.pages_since_checkpoint += 1
+        if self.checkpoint_interval > 0 and self.pages_since_checkpoint >= self.checkpoint_interval:
+            self.write_checkpoint(prepared.position)
+
+    def write_bookmark(self, value: Any) -> None:
+        # Update and write together so a STATE message never goes backwards when streams are synced in parallel
+        with self.writer.lock:
+            self.new_state[self.stream_id] = value
+            self.writer.write_state(dict(self.new_state))
+
+    def write_changes(self, changes: ChangeIndex) -> None:
+        """Writes tombstones for the rows which have disappeared and saves the hash index for the next sync."""
+        deleted_keys = changes.deleted_keys()
+        for key in deleted_keys:
+            now = datetime.now(timezone.utc)
+            self.writer.write_record(self.stream_id, changes.tombstone(key, now), time_extracted=now)
+        LOGGER.info(
+            "Output %d new or changed and %d deleted rows of %d for stream: %s",
+            changes.changed_count,
+            len(deleted_keys),
+            len(changes.current),
+            self.stream_id,
+        )
+        if self.hash_index_file is not None:
+            self.hash_index_file.write(self.stream_id, changes.current)
+            return
+        with self.writer.lock:
+            self.new_state[HASHES_KEY] = dict(self.new_state.get(HASHES_KEY, {}), **{self.stream_id: changes.current})
+            self.writer.write_state(dict(self.new_state))
+
+    def write_checkpoint(self, position: Optional[JsonResult]) -> None:
+        """Writes the position after the last page output so an interrupted sync can resume from it."""
+        if position is None:
+            return
+        self.pages_since_checkpoint = 0
+        with self.writer.lock:
+            self._set_checkpoint(dict(position, max_bookmark=self.max_bookmark.value))
+            self.writer.write_state(dict(self.new_state))
+
+    def _set_checkpoint(self, checkpoint: Optional[JsonResult]) -> bool:
+        """Replaces or with None removes the stream's checkpoint in new_state, returning whether it changed."""
+        checkpoints = dict(self.new_state.get(CHECKPOINTS_KEY, {}))
+        if checkpoint is None:
+            if self.stream_id not in checkpoints:
+                return False
+            del checkpoints[self.stream_id]
+        else:
+            checkpoints[self.stream_id] = checkpoint
+        if checkpoints:
+            self.new_state[CHECKPOINTS_KEY] = checkpoints
+        else:
+            self.new_state.pop(CHECKPOINTS_KEY, None)
+        return True
+
+
+def _same(prepared: PreparedRecords) -> PreparedRecords:
+    return prepared
+
+
+def _size(prepared: PreparedRecords) -> int:
+    return prepared.size
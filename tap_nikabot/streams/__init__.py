@@ -1,15 +1,33 @@
-from typing import List, Type
+import importlib
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    List,
+    Type,
+    cast,
+)
 
-from .groups import Groups
-from .projects import Projects
-from .records import Records
-from .roles import Roles
-from .stream import Stream
-from .teams import Teams
-from .users import Users
+if TYPE_CHECKING:
+    # Only loaded with the first stream, as it imports singer
+    from .stream import Stream
 
-all_streams: List[Type[Stream]] = [Users, Roles, Groups, Teams, Projects, Records]
+# Module and class of each stream, in discovery order. A stream's module is only imported when the stream is used.
+_STREAM_CLASSES: Dict[str, str] = {
+    "users": "users.Users",
+    "roles": "roles.Roles",
+    "groups": "groups.Groups",
+    "teams": "teams.Teams",
+    "projects": "projects.Projects",
+    "records": "records.Records",
+}
+stream_ids: List[str] = list(_STREAM_CLASSES)
 
 
-def get(stream_id: str) -> Type[Stream]:
-    return next(s for s in all_streams if s.stream_id == stream_id)
+def get(stream_id: str) -> Type["Stream"]:
+    module_name, class_name = _STREAM_CLASSES[stream_id].split(".")
+    module = importlib.import_module(f".{module_name}", __name__)
+    return cast(Type["Stream"], getattr(module, class_name))
+
+
+def get_all() -> List[Type["Stream"]]:
+    return [get(stream_id) for stream_id in stream_ids]
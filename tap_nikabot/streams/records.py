@@ -1,22 +1,41 @@
-from datetime import date
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
 from typing import (
+    TYPE_CHECKING,
     Any,
+    AsyncIterator,
     Dict,
     Iterator,
     List,
     Optional,
+    Tuple,
+    cast,
 )
 
+import singer
 from dateutil.parser import isoparse
-from singer import resolve_schema_references
 from singer.schema import Schema
 
+from .. import metrics
 from ..client import Client
 from ..errors import StartDateAfterEndDateError
 from ..replication_method import ReplicationMethod
+from ..schemas import SwaggerSchemas
 from ..typing import JsonResult
 from .stream import Stream
 
+if TYPE_CHECKING:
+    from ..async_client import AsyncClient
+
+LOGGER = singer.get_logger()
+DEFAULT_WINDOW_WORKERS = 4
+DEFAULT_LOOKBACK_DAYS = 0
+# Number of pages each window may buffer ahead of the consumer
+WINDOW_QUEUE_SIZE = 2
+_END_OF_WINDOW = object()
+
 
 def format_date(val: date) -> str:
     """Formats a date as %Y%m%d.
@@ -27,13 +46,35 @@ def format_date(val: date) -> str:
     return f"{val.year:04}{val.month:02}{val.day:02}"
 
 
+def split_date_range(start_date: date, end_date: date, window: str) -> List[Tuple[date, date]]:
+    """Splits an inclusive date range into consecutive inclusive windows of a "day", "week" or "month"."""
+    if window not in ("day", "week", "month"):
+        raise ValueError(f"Unsupported records window '{window}', valid options are 'day', 'week', 'month'")
+    windows = []
+    window_start = start_date
+    while window_start <= end_date:
+        if window == "month":
+            next_month = date(window_start.year + window_start.month // 12, window_start.month % 12 + 1, 1)
+            window_end = next_month - timedelta(days=1)
+        else:
+            window_end = window_start + timedelta(days=6 if window == "week" else 0)
+        window_end = min(window_end, end_date)
+        windows.append((window_start, window_end))
+        if window_end == end_date:
+            break
+        window_start = window_end + timedelta(days=1)
+    return windows
+
+
 class Records(Stream):
     stream_id: str = "records"
+    replication_key: Optional[str] = "date"
+    valid_replication_methods: List[ReplicationMethod] = [ReplicationMethod.FULL_TABLE, ReplicationMethod.INCREMENTAL]
+    resumable: bool = True
+    enrichable: bool = True
 
-    def _map_to_schema(self, swagger: JsonResult) -> Schema:
-        schema_with_refs = {**swagger["definitions"]["RecordDTO"], **{"definitions": swagger["definitions"]}}
-        schema = resolve_schema_references(schema_with_refs)
-        return Schema.from_dict(schema)
+    def _map_to_schema(self, schemas: SwaggerSchemas) -> Schema:
+        return Schema.from_dict(schemas.resolved("RecordDTO"))
 
     def get_records(
         self,
@@ -44,7 +85,38 @@ class Records(Stream):
         replication_method: Optional[ReplicationMethod],
     ) -> Iterator[List[JsonResult]]:
         self.validate_replication_method(replication_method)
+        windows, offset = self._resume_windows(self._get_windows(config, last_bookmark, replication_method))
+        if len(windows) == 0:
+            return iter([])
+        if len(windows) == 1:
+            pages = client.get_all_pages("/api/v1/records", params=self._window_params(*windows[0]), offset=offset)
+            return self._track_position(pages, windows[0], offset)
+        workers = int(config.get("records_window_workers", DEFAULT_WINDOW_WORKERS))
+        return self._get_windows_concurrently(client, windows, workers, offset)
 
+    async def get_records_async(
+        self,
+        client: "AsyncClient",
+        config: Dict[str, Any],
+        bookmark_column: str,
+        last_bookmark: Any,
+        replication_method: Optional[ReplicationMethod],
+    ) -> AsyncIterator[List[JsonResult]]:
+        self.validate_replication_method(replication_method)
+        windows, offset = self._resume_windows(self._get_windows(config, last_bookmark, replication_method))
+        for window in windows:
+            pages = client.get_all_pages("/api/v1/records", params=self._window_params(*window), offset=offset)
+            async for page in pages:
+                offset += len(page)
+                self.position = self._checkpoint(window, offset)
+                yield page
+            offset = 0
+
+    @staticmethod
+    def _get_windows(
+        config: Dict[str, Any], last_bookmark: Any, replication_method: Optional[ReplicationMethod]
+    ) -> List[Tuple[date, date]]:
+        """Returns the date windows to fetch records for, in date order."""
         start_date = date.min
         if "start_date" in config:
             start_date = isoparse(config["start_date"]).date()
@@ -55,5 +127,111 @@ class Records(Stream):
             if end_date < start_date:
                 raise StartDateAfterEndDateError(start_date, end_date)
 
-        params = {"dateStart": format_date(start_date), "dateEnd": format_date(end_date)}
-        return client.get_all_pages("/api/v1/records", params=params)
+        if replication_method == ReplicationMethod.INCREMENTAL and last_bookmark:
+            # Records can be entered against past days, so re-read a window before the bookmark
+            lookback = timedelta(days=int(config.get("lookback_days", DEFAULT_LOOKBACK_DAYS)))
+            start_date = max(start_date, isoparse(last_bookmark).date() - lookback)
+            if start_date > end_date:
+                return []
+
+        window = config.get("records_window")
+        if not window:
+            return [(start_date, end_date)]
+        if start_date == date.min:
+            LOGGER.warning("Ignoring records_window as no start_date is configured")
+            return [(start_date, end_date)]
+
+        if "end_date" in config:
+            return split_date_range(start_date, end_date, window)
+        # Records can be entered against future days, so they're fetched by one last window with no end
+        today = date.today()
+        if start_date > today:
+            return [(start_date, end_date)]
+        return split_date_range(start_date, today, window) + [(today + timedelta(days=1), end_date)]
+
+    @staticmethod
+    def _window_params(window_start: date, window_end: date) -> Dict[str, str]:
+        return {"dateStart": format_date(window_start), "dateEnd": format_date(window_end)}
+
+    @staticmethod
+    def _checkpoint(window: Tuple[date, date], offset: int) -> JsonResult:
+        return {"window_start": window[0].isoformat(), "window_end": window[1].isoformat(), "offset": offset}
+
+    def _resume_windows(self, windows: List[Tuple[date, date]]) -> Tuple[List[Tuple[date, date]], int]:
+        """Drops the windows finished before the checkpoint, returning the rows to skip in the first window."""
+        checkpoint = self.resume_from
+        if not checkpoint:
+            return windows, 0
+        window = (isoparse(checkpoint["window_start"]).date(), isoparse(checkpoint["window_end"]).date())
+        if window not in windows:
+            LOGGER.warning("Ignoring checkpoint for records from %s to %s which are no longer being synced", *window)
+            return windows, 0
+        LOGGER.info("Resuming records from %s to %s after %s rows", window[0], window[1], checkpoint["offset"])
+        return windows[windows.index(window) :], int(checkpoint["offset"])
+
+    def _track_position(
+        self, pages: Iterator[List[JsonResult]], window: Tuple[date, date], offset: int
+    ) -> Iterator[List[JsonResult]]:
+        for page in pages:
+            offset += len(page)
+            self.position = self._checkpoint(window, offset)
+            yield page
+
+    def _get_windows_concurrently(
+        self, client: Client, windows: List[Tuple[date, date]], workers: int, offset: int
+    ) -> Iterator[List[JsonResult]]:
+        """Pages each date window on a worker thread and yields the pages in window order.
+
+        Windows are started in order and no more than workers at once, so the window being consumed is always
+        running and the next ones only buffer a few pages ahead of it. The first window starts after offset rows.
+        """
+        stop = threading.Event()
+        queues: List["queue.Queue[Any]"] = [queue.Queue(maxsize=WINDOW_QUEUE_SIZE) for _ in windows]
+
+        def put(window_queue: "queue.Queue[Any]", item: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    window_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def page_window(window: Tuple[date, date], window_offset: int, window_queue: "queue.Queue[Any]") -> None:
+            try:
+                params = Records._window_params(*window)
+                for page in client.get_all_pages("/api/v1/records", params=params, offset=window_offset):
+                    if not put(window_queue, page):
+                        return
+                put(window_queue, _END_OF_WINDOW)
+            except BaseException as ex:
+                put(window_queue, ex)
+
+        page_window_in_context = metrics.run_in_context(page_window)
+        workers = max(1, workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(page_window_in_context, window, offset if i == 0 else 0, window_queue)
+                for i, (window, window_queue) in enumerate(zip(windows[:workers], queues))
+            ]
+            try:
+                for i, (window, window_queue) in enumerate(zip(windows, queues)):
+                    while True:
+                        item = window_queue.get()
+                        if item is _END_OF_WINDOW:
+                            break
+                        if isinstance(item, BaseException):
+                            raise item
+                        offset += len(item)
+                        self.position = self._checkpoint(window, offset)
+                        yield cast(List[JsonResult], item)
+                    offset = 0
+                    # Start the next window now this one is done, keeping workers windows in flight
+                    if i + workers < len(windows):
+                        futures.append(
+                            executor.submit(page_window_in_context, windows[i + workers], 0, queues[i + workers])
+                        )
+            finally:
+                stop.set()
+                for future in futures:
+                    future.cancel()
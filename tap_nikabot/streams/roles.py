@@ -1,5 +1,7 @@
 from typing import (
+    TYPE_CHECKING,
     Any,
+    AsyncIterator,
     Dict,
     Iterator,
     List,
@@ -10,15 +12,20 @@ from singer.schema import Schema
 
 from ..client import Client
 from ..replication_method import ReplicationMethod
+from ..schemas import SwaggerSchemas
 from ..typing import JsonResult
 from .stream import Stream
 
+if TYPE_CHECKING:
+    from ..async_client import AsyncClient
+
 
 class Roles(Stream):
     stream_id: str = "roles"
+    change_detection: bool = True
 
-    def _map_to_schema(self, swagger: JsonResult) -> Schema:
-        return Schema.from_dict(swagger["definitions"]["RoleDTO"])
+    def _map_to_schema(self, schemas: SwaggerSchemas) -> Schema:
+        return Schema.from_dict(schemas.definition("RoleDTO"))
 
     def get_records(
         self,
@@ -30,3 +37,15 @@ class Roles(Stream):
     ) -> Iterator[List[JsonResult]]:
         self.validate_replication_method(replication_method)
         return client.get_all_pages("/api/v1/roles")
+
+    async def get_records_async(
+        self,
+        client: "AsyncClient",
+        config: Dict[str, Any],
+        bookmark_column: str,
+        last_bookmark: Any,
+        replication_method: Optional[ReplicationMethod],
+    ) -> AsyncIterator[List[JsonResult]]:
+        self.validate_replication_method(replication_method)
+        async for page in client.get_all_pages("/api/v1/roles"):
+            yield page
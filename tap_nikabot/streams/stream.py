@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import (
+    TYPE_CHECKING,
     Any,
+    AsyncIterator,
     Dict,
     Iterator,
     List,
@@ -14,8 +16,13 @@ from tap_nikabot.errors import InvalidReplicationMethodError
 
 from ..client import Client
 from ..replication_method import ReplicationMethod
+from ..schemas import SwaggerSchemas
 from ..typing import JsonResult
 
+if TYPE_CHECKING:
+    # Only loaded by sync_async, asyncio is slow to import and most syncs don't use it
+    from ..async_client import AsyncClient
+
 LOGGER = singer.get_logger()
 
 
@@ -26,9 +33,22 @@ class Stream(ABC):
     replication_method: Optional[ReplicationMethod] = None
     replication_key_is_sorted: bool = False
     valid_replication_methods: List[ReplicationMethod] = [ReplicationMethod.FULL_TABLE]
+    # Whether get_records can resume part way through from a checkpoint
+    resumable: bool = False
+    # Whether records are given the fields of the user, team and project they refer to with enrich_records
+    enrichable: bool = False
+    # Whether only new, changed and deleted rows are output with change_detection, for streams which always read
+    # the full table
+    change_detection: bool = False
+
+    def __init__(self) -> None:
+        # Checkpoint to resume from, set before calling get_records
+        self.resume_from: Optional[JsonResult] = None
+        # Checkpoint after the last page yielded by get_records
+        self.position: Optional[JsonResult] = None
 
-    def get_catalog_entry(self, swagger: JsonResult) -> CatalogEntry:
-        schema = self._map_to_schema(swagger)
+    def get_catalog_entry(self, schemas: SwaggerSchemas) -> CatalogEntry:
+        schema = self._map_to_schema(schemas)
         stream_metadata = metadata.get_standard_metadata(
             schema=schema.to_dict(),
             key_properties=self.key_properties,
@@ -61,5 +81,16 @@ class Stream(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def _map_to_schema(self, swagger: JsonResult) -> Schema:
+    def get_records_async(
+        self,
+        client: "AsyncClient",
+        config: Dict[str, Any],
+        bookmark_column: str,
+        last_bookmark: Any,
+        replication_method: Optional[ReplicationMethod],
+    ) -> AsyncIterator[List[JsonResult]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _map_to_schema(self, schemas: SwaggerSchemas) -> Schema:
         raise NotImplementedError
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+import singer
+
+from . import jsonlib
+from .client import Client
+from .errors import SwaggerNotCachedError
+
+LOGGER = singer.get_logger()
+NOT_MODIFIED = 304
+
+
+def default_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "tap-nikabot")
+
+
+class SwaggerCache:
+    """Keeps the swagger definition on disk so discovery doesn't need to download it every run.
+
+    A cached definition younger than ttl seconds is used as is. An older one is revalidated with a conditional
+    request using its ETag and Last-Modified headers, so it's only downloaded again when it has changed. In offline
+    mode the cached definition is always used, however old.
+    """
+
+    def __init__(self, cache_dir: str, ttl: float, offline: bool = False) -> None:
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, "swagger.json")
+        self.ttl = ttl
+        self.offline = offline
+
+    def fetch_swagger_definition(self, client: Client) -> Any:
+        entry = self._read()
+        if self.offline:
+            if entry is None:
+                raise SwaggerNotCachedError(self.path)
+            LOGGER.info("Using cached swagger definition from %s", self.path)
+            return entry["swagger"]
+        if entry is not None and time.time() - entry["fetched_at"] < self.ttl:
+            LOGGER.info("Using cached swagger definition from %s", self.path)
+            return entry["swagger"]
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        response = client.request_swagger_definition(headers)
+        if entry is not None and response.status_code == NOT_MODIFIED:
+            LOGGER.info("Cached swagger definition is unchanged")
+            entry["fetched_at"] = time.time()
+        else:
+            entry = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+                "swagger": jsonlib.loads(response.content),
+            }
+        self._write(entry)
+        return entry["swagger"]
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path, "rb") as cache_file:
+                return dict(jsonlib.loads(cache_file.read()))
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            LOGGER.warning("Ignoring invalid swagger cache %s", self.path)
+            return None
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        cache_dir = os.path.dirname(self.path)
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write then rename so a concurrent run never reads a partly written file
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, prefix=".swagger-")
+        try:
+            with os.fdopen(fd, "w") as cache_file:
+                json.dump(entry, cache_file)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
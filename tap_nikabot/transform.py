@@ -0,0 +1,186 @@
+import re
+from datetime import datetime
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Optional,
+    Set,
+    cast,
+)
+
+from singer import Transformer, metadata
+
+from .typing import JsonResult
+
+Converter = Callable[[Any], Any]
+
+# The ISO 8601 dates returned by the Nikabot API, optionally suffixed with a UTC timezone
+_DATETIME_RE = re.compile(r"(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?(?:Z|\+00:00)?\Z")
+
+
+class _Fallback(Exception):
+    """Raised when a value isn't handled by a compiled converter and needs the generic transformer."""
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _dict(value: Any) -> Any:
+    if not isinstance(value, dict):
+        raise _Fallback
+    return value
+
+
+def _string(value: Any) -> Any:
+    if type(value) is not str:  # pylint: disable=unidiomatic-typecheck
+        raise _Fallback
+    return value
+
+
+def _integer(value: Any) -> Any:
+    if type(value) is not int:  # pylint: disable=unidiomatic-typecheck
+        raise _Fallback
+    return value
+
+
+def _number(value: Any) -> Any:
+    if type(value) is float:  # pylint: disable=unidiomatic-typecheck
+        return value
+    if type(value) is int:  # pylint: disable=unidiomatic-typecheck
+        try:
+            return float(value)
+        except OverflowError:
+            raise _Fallback from None
+    raise _Fallback
+
+
+def _boolean(value: Any) -> Any:
+    if value is True or value is False:
+        return value
+    raise _Fallback
+
+
+def _datetime(value: Any) -> Any:
+    """Formats a date-time the same as singer.utils.strftime(singer.utils.strptime_to_utc(value))."""
+    if type(value) is not str:  # pylint: disable=unidiomatic-typecheck
+        raise _Fallback
+    match = _DATETIME_RE.match(value)
+    if not match:
+        raise _Fallback
+    year, month, day, hour, minute, second, fraction = match.groups()
+    if int(year) < 1000:
+        # strftime formats years below 1000 differently across platforms
+        raise _Fallback
+    try:
+        datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+    except ValueError:
+        raise _Fallback from None
+    return f"{year}-{month}-{day}T{hour}:{minute}:{second}.{(fraction or '').ljust(6, '0')}Z"
+
+
+def _object(properties: Dict[str, Converter]) -> Converter:
+    def convert(value: Any) -> Any:
+        if not isinstance(value, dict):
+            raise _Fallback
+        result = {}
+        for key, item in value.items():
+            # Unknown keys are left to the generic transformer which tracks them as removed
+            result[key] = properties[key](item)
+        return result
+
+    return convert
+
+
+def _array(items: Converter) -> Converter:
+    def convert(value: Any) -> Any:
+        if not isinstance(value, list):
+            raise _Fallback
+        return [items(item) for item in value]
+
+    return convert
+
+
+def _nullable(converter: Converter) -> Converter:
+    def convert(value: Any) -> Any:
+        return None if value is None else converter(value)
+
+    return convert
+
+
+def _compile(schema: JsonResult) -> Optional[Converter]:
+    """Compiles a JSON schema into a converter, returns None if the schema isn't supported."""
+    if "anyOf" in schema:
+        return None
+    if "type" not in schema:
+        return _identity
+
+    types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+    non_null_types = [t for t in types if t != "null"]
+    if len(non_null_types) != 1:
+        return None
+    typ = non_null_types[0]
+
+    converter: Optional[Converter]
+    if schema.get("format") == "date-time":
+        converter = _datetime
+    elif typ == "object":
+        if schema.get("patternProperties"):
+            return None
+        properties = {key: _compile(sub_schema) for key, sub_schema in schema.get("properties", {}).items()}
+        if any(p is None for p in properties.values()):
+            return None
+        converter = _object(cast(Dict[str, Converter], properties)) if properties else _dict
+    elif typ == "array":
+        items = _compile(schema["items"])
+        if items is None:
+            return None
+        converter = _array(items)
+    else:
+        converter = {"string": _string, "integer": _integer, "number": _number, "boolean": _boolean}.get(typ)
+        if converter is None:
+            return None
+
+    # Transformer converts None to False for booleans before trying null, so leave that to the generic path
+    if "null" in types and typ != "boolean":
+        converter = _nullable(converter)
+    return converter
+
+
+def _filtered_fields(schema: JsonResult, metadata_map: Dict[Any, Any]) -> Set[str]:
+    """Returns the fields Transformer.filter_data_by_metadata would remove."""
+    fields = set()
+    for field_name in schema.get("properties", {}):
+        selected = metadata.get(metadata_map, ("properties", field_name), "selected")
+        inclusion = metadata.get(metadata_map, ("properties", field_name), "inclusion")
+        if inclusion != "automatic" and (selected is False or inclusion == "unsupported"):
+            fields.add(field_name)
+    return fields
+
+
+class RecordTransformer(Transformer):  # type: ignore
+    """Transforms records for one stream with the same output as Transformer.transform.
+
+    The schema is compiled into a converter function once. Values which don't match the fast path, and schemas
+    which can't be compiled, are handed to the generic Transformer. That includes records with fields missing from
+    the schema, so the generic Transformer tracks them as removed, while the fast path tracks the fields it filters.
+    """
+
+    def __init__(self, schema: JsonResult, metadata_map: Dict[Any, Any]) -> None:
+        super().__init__()
+        self.schema = schema
+        self.metadata_map = metadata_map
+        self.converter = _compile(schema)
+        self.filtered_fields = _filtered_fields(schema, metadata_map) if metadata_map else set()
+
+    def transform_record(self, record: JsonResult) -> Any:
+        if self.converter is not None:
+            try:
+                if self.filtered_fields and isinstance(record, dict):
+                    self.filtered.update(self.filtered_fields.intersection(record))
+                    return self.converter({k: v for k, v in record.items() if k not in self.filtered_fields})
+                return self.converter(record)
+            except (_Fallback, KeyError):
+                pass
+        return self.transform(record, self.schema, self.metadata_map)
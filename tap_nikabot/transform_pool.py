@@ -0,0 +1,109 @@
+import uuid
+from concurrent.futures import Future
+from datetime import datetime
+from types import TracebackType
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+import singer
+
+from .changes import record_digest
+from .transform import RecordTransformer
+from .typing import JsonResult
+from .writer import format_line
+
+# Lines of RECORD messages, and the key and digest of each line's record when asked for
+TransformedPage = Tuple[List[str], Optional[List[Tuple[str, str]]]]
+# The schema records of a stream are transformed to, and its metadata map
+StreamSchema = Tuple[JsonResult, Dict[Any, Any]]
+# The pool and stream ID a schema was sent for
+StreamKey = Tuple[str, str]
+
+# Schema of each stream, sent to each worker process once when it starts
+_schemas: Dict[StreamKey, StreamSchema] = {}
+# Transformer of each stream, built by each worker process the first time it's given a page of the stream
+_transformers: Dict[StreamKey, RecordTransformer] = {}
+
+
+def init_worker(schemas: Dict[StreamKey, StreamSchema]) -> None:
+    _schemas.update(schemas)
+
+
+def transform_page(
+    stream_key: StreamKey,
+    records: List[JsonResult],
+    time_extracted: datetime,
+    key_property: Optional[str],
+) -> TransformedPage:
+    """Transforms records and formats them as RECORD messages, run on a worker process.
+
+    With a key_property the key and digest of each transformed record is returned for change detection.
+    """
+    transformer = _transformers.get(stream_key)
+    if transformer is None:
+        transformer = _transformers[stream_key] = RecordTransformer(*_schemas[stream_key])
+    stream_id = stream_key[1]
+    lines = []
+    digests: Optional[List[Tuple[str, str]]] = [] if key_property else None
+    for record in records:
+        transformed = transformer.transform_record(record)
+        lines.append(format_line(singer.RecordMessage(stream_id, transformed, time_extracted=time_extracted)))
+        if digests is not None and key_property:
+            digests.append((str(transformed[key_property]), record_digest(transformed)))
+    return lines, digests
+
+
+class TransformPool:
+    """Worker processes which transform and format pages of records, so it isn't limited to one CPU.
+
+    Processes are spawned rather than forked as the tap is already running threads when they start. Each is sent the
+    schema of every stream in schemas when it starts, so pages are sent without them.
+    """
+
+    def __init__(self, processes: int, schemas: Dict[str, StreamSchema]) -> None:
+        # multiprocessing is slow to import, so it's only loaded by syncs using it
+        import multiprocessing  # pylint: disable=import-outside-toplevel
+
+        self.processes = processes
+        # Enough pages are in flight for every process to start on the next as soon as it finishes one
+        self.max_pending = processes * 2
+        self.key = uuid.uuid4().hex
+        # A Pool rather than a ProcessPoolExecutor, which can't be given a start method or initializer before 3.7
+        self.pool = multiprocessing.get_context("spawn").Pool(
+            processes, init_worker, ({(self.key, stream_id): schema for stream_id, schema in schemas.items()},)
+        )
+
+    def __enter__(self) -> "TransformPool":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.pool.close()
+        else:
+            self.pool.terminate()
+        self.pool.join()
+
+    def submit(
+        self, stream_id: str, records: List[JsonResult], time_extracted: datetime, key_property: Optional[str]
+    ) -> "Future[TransformedPage]":
+        future: "Future[TransformedPage]" = Future()
+        # Pages are sent to a process straight away, so like a ProcessPoolExecutor's they can't be cancelled
+        future.set_running_or_notify_cancel()
+        self.pool.apply_async(
+            transform_page,
+            ((self.key, stream_id), records, time_extracted, key_property),
+            callback=future.set_result,
+            error_callback=future.set_exception,
+        )
+        return future
@@ -0,0 +1,76 @@
+import sys
+import threading
+from datetime import datetime
+from types import TracebackType
+from typing import Any, List, Optional, Type
+
+import singer
+
+from . import jsonlib
+from .typing import JsonResult
+
+
+def format_line(message: Any) -> str:
+    """Formats a message as a line of output."""
+    return jsonlib.format_message(message) + "\n"
+
+
+class MessageWriter:
+    """Writes Singer messages to stdout, optionally buffering them to write in large chunks.
+
+    Messages are written in the order they're given, so a STATE message is never output before the records it covers.
+    With a buffer_size of 0 every message is written and flushed immediately, the same as singer.write_message.
+    Messages can be written from multiple threads, hold the lock to write several messages without interleaving.
+    """
+
+    def __init__(self, buffer_size: int = 0) -> None:
+        self.buffer_size = buffer_size
+        self.lock = threading.RLock()
+        self._buffer: List[str] = []
+        self._buffered_bytes = 0
+
+    def __enter__(self) -> "MessageWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.flush()
+
+    def write_schema(
+        self, stream_name: str, schema: JsonResult, key_properties: List[str], bookmark_properties: Optional[List[str]]
+    ) -> None:
+        self.write_message(singer.SchemaMessage(stream_name, schema, key_properties, bookmark_properties))
+
+    def write_record(self, stream_name: str, record: JsonResult, time_extracted: Optional[datetime] = None) -> None:
+        self.write_message(singer.RecordMessage(stream_name, record, time_extracted=time_extracted))
+
+    def write_state(self, value: JsonResult) -> None:
+        self.write_message(singer.StateMessage(value))
+
+    def write_message(self, message: Any) -> None:
+        self.write_lines([format_line(message)])
+
+    def write_lines(self, lines: List[str]) -> None:
+        """Writes messages already formatted by format_line."""
+        with self.lock:
+            if self.buffer_size <= 0:
+                for line in lines:
+                    sys.stdout.write(line)
+                    sys.stdout.flush()
+                return
+            self._buffer.extend(lines)
+            self._buffered_bytes += sum(len(line) for line in lines)
+            if self._buffered_bytes >= self.buffer_size:
+                self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            if self._buffer:
+                sys.stdout.write("".join(self._buffer))
+                self._buffer = []
+                self._buffered_bytes = 0
+            sys.stdout.flush()
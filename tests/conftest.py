@@ -15,6 +15,16 @@ def mock_stdout():
 
 @pytest.fixture(autouse=True)
 def mock_datetime():
-    with patch("tap_nikabot.datetime", wraps=datetime) as mock:
+    with patch("tap_nikabot.stream_sync.datetime", wraps=datetime) as mock:
         mock.now.return_value = datetime(2020, 1, 1, tzinfo=timezone.utc)
         yield
+
+
+@pytest.fixture()
+def mock_json_backend():
+    """Use the standard library JSON backend, for tests of singer's exact formatting.
+
+    Other tests use the fastest backend installed, as the tap does.
+    """
+    with patch("tap_nikabot.jsonlib.orjson", None), patch("tap_nikabot.jsonlib.ujson", None):
+        yield
@@ -0,0 +1,43 @@
+# pylint: disable=no-self-use
+from tap_nikabot.bookmarks import BookmarkTracker, bookmark_key
+
+
+class TestBookmarks:
+    def test_should_track_largest_date_time_given_mixed_formats(self):
+        tracker = BookmarkTracker("2020-06-10T00:00:00+10:00")
+        tracker.update_rows(
+            [{"date": "2020-06-09T12:00:00Z"}, {"date": "2020-06-09T20:00:00.5"}, {"date": "2020-06-09T16:00:00"}],
+            "date",
+        )
+        assert tracker.value == "2020-06-09T20:00:00.5"
+
+    def test_should_keep_first_value_given_equal_date_times(self):
+        tracker = BookmarkTracker("2020-06-10T00:00:00")
+        tracker.update("2020-06-10T00:00:00.000Z")
+        assert tracker.value == "2020-06-10T00:00:00"
+
+    def test_should_ignore_none(self):
+        tracker = BookmarkTracker()
+        tracker.update(None)
+        assert tracker.value is None
+        tracker.update("2020-06-10T00:00:00")
+        tracker.update(None)
+        assert tracker.value == "2020-06-10T00:00:00"
+
+    def test_should_compare_values_of_different_kinds(self):
+        assert bookmark_key(10) < bookmark_key("2020-06-10") < bookmark_key("not a date")
+        assert bookmark_key(2) < bookmark_key(10.5)
+
+    def test_should_merge_without_parsing(self):
+        tracker = BookmarkTracker("2020-06-10T00:00:00")
+        page = BookmarkTracker()
+        page.update_rows([{"date": "2020-06-11T00:00:00Z"}, {"date": "2020-06-09T00:00:00"}], "date")
+        tracker.merge(page)
+        assert tracker.value == "2020-06-11T00:00:00Z"
+        tracker.merge(BookmarkTracker())
+        assert tracker.value == "2020-06-11T00:00:00Z"
+
+    def test_should_ignore_none_given_rows(self):
+        tracker = BookmarkTracker("2020-06-10T00:00:00")
+        tracker.update_rows([{"date": None}, {"date": "2020-06-11T00:00:00"}, {"date": None}], "date")
+        assert tracker.value == "2020-06-11T00:00:00"
@@ -0,0 +1,61 @@
+# pylint: disable=redefined-outer-name, no-self-use
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+import singer
+
+from tap_nikabot import jsonlib
+
+orjson = pytest.importorskip("orjson")
+
+
+@pytest.fixture(autouse=True)
+def use_orjson():
+    with patch("tap_nikabot.jsonlib.orjson", orjson):
+        yield
+
+
+class TestJsonlib:
+    def test_should_use_orjson_backend(self):
+        assert jsonlib.backend() == "orjson"
+
+    def test_should_encode_record_message_equivalent_to_singer(self):
+        message = singer.RecordMessage(
+            "records",
+            {"id": "5ee2ca823e056d00141896a0", "hours": 7.5, "project_name": "Leave (All Kinds) é"},
+            time_extracted=datetime(2020, 1, 1, tzinfo=timezone.utc),
+        )
+        assert json.loads(jsonlib.format_message(message)) == json.loads(singer.format_message(message))
+
+    def test_should_format_record_message_compactly_without_escaping(self):
+        message = singer.RecordMessage("records", {"project_name": "Leave é", "hours": 7.5})
+        assert jsonlib.format_message(message) == (
+            '{"type":"RECORD","stream":"records","record":{"project_name":"Leave é","hours":7.5}}'
+        )
+        assert singer.format_message(message) == (
+            '{"type": "RECORD", "stream": "records", "record": {"project_name": "Leave \\u00e9", "hours": 7.5}}'
+        )
+
+    def test_should_encode_nan_as_null(self):
+        message = singer.RecordMessage("records", {"hours": float("nan")})
+        assert jsonlib.format_message(message) == '{"type":"RECORD","stream":"records","record":{"hours":null}}'
+        assert singer.format_message(message) == '{"type": "RECORD", "stream": "records", "record": {"hours": NaN}}'
+
+    def test_should_encode_decimals_exactly(self):
+        message = singer.RecordMessage("records", {"hours": Decimal("7.50")})
+        assert jsonlib.format_message(message) == '{"type": "RECORD", "stream": "records", "record": {"hours": 7.50}}'
+
+    def test_should_fail_to_encode_datetime_values_like_singer(self):
+        message = singer.RecordMessage("records", {"date": datetime(2020, 1, 1)})
+        with pytest.raises(TypeError):
+            singer.format_message(message)
+        with pytest.raises(TypeError):
+            jsonlib.format_message(message)
+
+    def test_should_decode_large_integers(self):
+        assert jsonlib.loads(b'{"result": [{"id": 1180591620717411303424}]}') == {
+            "result": [{"id": 1180591620717411303424}]
+        }
@@ -0,0 +1,40 @@
+# pylint: disable=no-self-use
+import json
+
+import pytest
+
+from tap_nikabot.errors import ServerError
+from tap_nikabot.jsonstream import iter_result
+
+RESPONSE = {
+    "ok": True,
+    "result": [{"id": str(i), "hours": i * 1.5, "name": 'é"\\ \u00e9', "tags": [1, None, True]} for i in range(7)],
+}
+
+
+def chunked(text, size):
+    data = text.encode("utf-8")
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestIterResult:
+    @pytest.mark.parametrize("chunk_size", [1, 3, 64, 100000])
+    def test_should_yield_result_items_in_batches(self, chunk_size):
+        batches = list(iter_result(chunked(json.dumps(RESPONSE, ensure_ascii=False), chunk_size), 3))
+        assert [len(batch) for batch in batches] == [3, 3, 1]
+        assert [item for batch in batches for item in batch] == RESPONSE["result"]
+
+    def test_should_yield_nothing_given_empty_result(self):
+        assert list(iter_result(chunked(' { "ok" : true , "result" : [ ] } ', 2), 3)) == []
+
+    def test_should_allow_properties_after_result(self):
+        text = '{"result":[{"id":1},{"id":22}],"ok":true,"count":22}'
+        assert list(iter_result(chunked(text, 1), 10)) == [[{"id": 1}, {"id": 22}]]
+
+    def test_should_raise_server_error_given_not_ok(self):
+        with pytest.raises(ServerError, match="Invalid token"):
+            list(iter_result(chunked('{"ok":false,"message":"Invalid token","result":[]}', 4), 10))
+
+    def test_should_raise_error_given_truncated_response(self):
+        with pytest.raises(ValueError):
+            list(iter_result(chunked('{"ok":true,"result":[{"id":1},{"id"', 4), 10))
@@ -0,0 +1,123 @@
+# pylint: disable=redefined-outer-name, no-self-use
+import json
+import logging
+from unittest.mock import MagicMock, patch
+
+import pytest
+from singer.catalog import Catalog, CatalogEntry
+from singer.schema import Schema
+
+from tap_nikabot import sync
+from tap_nikabot.metrics import StreamMetrics
+
+LOGGER = logging.getLogger()
+EMPTY_RESPONSE = '{"ok":true,"result":[]}'
+USERS_RESPONSE = '{"ok":true,"result":[{"id":"5de459977292020014fb601c","name":"Billy"},{"id":"68QMxnnt8YcpPdfmM","name":"paul.heasley"}]}'
+USERS_URL = "https://api.nikabot.com/api/v1/users?limit=1000&page={}"
+
+
+@pytest.fixture()
+def mock_logger():
+    with patch.object(LOGGER, "info", MagicMock()) as mock:
+        yield mock
+
+
+@pytest.fixture()
+def users_catalog():
+    return Catalog(
+        streams=[
+            CatalogEntry(
+                tap_stream_id="users",
+                stream="users",
+                schema=Schema.from_dict({}),
+                key_properties=["id"],
+                metadata=[{"breadcrumb": [], "metadata": {"selected": True}}],
+            )
+        ]
+    )
+
+
+def logged_metrics(mock_logger):
+    return {
+        point["metric"]: point
+        for point in (json.loads(c.args[1]) for c in mock_logger.mock_calls if c.args[0] == "METRIC: %s")
+    }
+
+
+class TestMetrics:
+    def test_should_log_stream_metrics(self, mock_stdout, mock_logger, requests_mock, users_catalog):
+        requests_mock.get(USERS_URL.format(0), text=USERS_RESPONSE)
+        requests_mock.get(USERS_URL.format(1), text=EMPTY_RESPONSE)
+        config = {"access_token": "my-access-token", "page_size": 1000, "metrics": True}
+        sync(config, {}, users_catalog)
+        points = logged_metrics(mock_logger)
+        assert points["record_count"]["value"] == 2
+        assert points["record_count"]["tags"] == {"endpoint": "users"}
+        assert points["request_count"]["value"] == 2
+        assert points["bytes_downloaded"]["value"] == len(USERS_RESPONSE) + len(EMPTY_RESPONSE)
+        assert points["http_request_duration"]["value"]["count"] == 2
+        assert sum(points["http_request_duration"]["value"]["buckets"].values()) == 2
+        assert {"rate_limit_duration", "backoff_duration", "decode_duration", "transform_duration"} < set(points)
+
+    def test_should_time_rate_limit_waits(self, mock_stdout, mock_logger, requests_mock, users_catalog):
+        requests_mock.get(USERS_URL.format(0), text=USERS_RESPONSE)
+        requests_mock.get(USERS_URL.format(1), text=EMPTY_RESPONSE)
+        config = {
+            "access_token": "my-access-token",
+            "page_size": 1000,
+            "metrics": True,
+            "rate_limit": 2,
+            "rate_limit_period": 10,
+            "rate_limit_burst": 1,
+        }
+        with patch("tap_nikabot.ratelimit.time.sleep"):
+            sync(config, {}, users_catalog)
+        assert logged_metrics(mock_logger)["rate_limit_duration"]["value"] == pytest.approx(10, abs=0.5)
+
+    def test_should_count_retries(self, mock_stdout, mock_logger, requests_mock, users_catalog):
+        requests_mock.get(
+            USERS_URL.format(0),
+            [{"status_code": 429, "headers": {"Retry-After": "3"}}, {"text": USERS_RESPONSE}],
+        )
+        requests_mock.get(USERS_URL.format(1), text=EMPTY_RESPONSE)
+        config = {"access_token": "my-access-token", "page_size": 1000, "metrics": True}
+        with patch("tap_nikabot.retry.time.sleep"):
+            sync(config, {}, users_catalog)
+        points = logged_metrics(mock_logger)
+        assert points["retry_count"]["value"] == 1
+        assert points["backoff_duration"]["value"] == 3.0
+
+    def test_should_count_requests_from_worker_threads(self, mock_stdout, mock_logger, requests_mock, users_catalog):
+        requests_mock.get(USERS_URL.format(0), text=USERS_RESPONSE)
+        for page in range(1, 3):
+            requests_mock.get(USERS_URL.format(page), text=EMPTY_RESPONSE)
+        config = {"access_token": "my-access-token", "page_size": 1000, "metrics": True, "max_concurrent_requests": 2}
+        sync(config, {}, users_catalog)
+        assert logged_metrics(mock_logger)["request_count"]["value"] >= 2
+
+    def test_should_log_summary(self, mock_stdout, mock_logger, requests_mock, users_catalog):
+        requests_mock.get(USERS_URL.format(0), text=USERS_RESPONSE)
+        requests_mock.get(USERS_URL.format(1), text=EMPTY_RESPONSE)
+        config = {"access_token": "my-access-token", "page_size": 1000, "metrics": True}
+        sync(config, {}, users_catalog)
+        messages = [c.args[0] % c.args[1:] for c in mock_logger.mock_calls]
+        summary = messages[messages.index("Sync summary:") + 1]
+        assert summary.startswith("  users: 2 records in ")
+
+    def test_should_not_log_metrics_by_default(self, mock_stdout, mock_logger, requests_mock, users_catalog):
+        requests_mock.get(USERS_URL.format(0), text=USERS_RESPONSE)
+        requests_mock.get(USERS_URL.format(1), text=EMPTY_RESPONSE)
+        sync({"access_token": "my-access-token", "page_size": 1000}, {}, users_catalog)
+        assert logged_metrics(mock_logger) == {}
+
+
+class TestStreamMetrics:
+    def test_should_bucket_latencies(self):
+        stream_metrics = StreamMetrics("users")
+        for latency in (0.01, 0.2, 0.2, 100):
+            stream_metrics.add_request(latency, 0)
+        histogram = stream_metrics.latency_histogram()
+        assert histogram["0.05"] == 1
+        assert histogram["0.25"] == 2
+        assert histogram["+Inf"] == 1
+        assert stream_metrics.percentile(50) == 0.2
@@ -0,0 +1,33 @@
+# pylint: disable=no-self-use
+from tap_nikabot.pagination import AdaptivePageSize
+
+
+class TestAdaptivePageSize:
+    def test_should_clamp_initial_page_size_to_bounds(self):
+        assert AdaptivePageSize(1000, 100, 500).page_size == 500
+
+    def test_should_grow_page_size_only_when_offset_is_aligned(self):
+        tuner = AdaptivePageSize(100, 100, 1000)
+        tuner.update(100, 100, 1.0, 1000)
+        assert tuner.page_size == 100
+        tuner.update(200, 100, 1.0, 1000)
+        assert tuner.page_size == 200
+        assert tuner.page_for_offset(200) == 1
+
+    def test_should_not_grow_past_max_page_size(self):
+        tuner = AdaptivePageSize(400, 100, 500)
+        tuner.update(400, 400, 1.0, 1000)
+        tuner.update(800, 400, 1.0, 1000)
+        assert tuner.page_size == 400
+
+    def test_should_shrink_page_size_when_throughput_drops(self):
+        tuner = AdaptivePageSize(400, 100, 1000)
+        tuner.update(800, 400, 1.0, 1000)
+        assert tuner.page_size == 800
+        tuner.update(1600, 800, 4.0, 1000)
+        assert tuner.page_size == 400
+
+    def test_should_not_change_page_size_given_last_page(self):
+        tuner = AdaptivePageSize(100, 100, 1000)
+        tuner.update(200, 50, 1.0, 1000)
+        assert tuner.page_size == 100
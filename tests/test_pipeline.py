@@ -0,0 +1,58 @@
+# pylint: disable=no-self-use
+import threading
+import time
+
+import pytest
+
+from tap_nikabot.pipeline import ByteBudget, run_pipeline
+
+
+class TestPipeline:
+    def test_should_write_items_in_order(self):
+        written = []
+        run_pipeline(iter(range(20)), lambda i: i * 2, written.append, lambda _: 1, ByteBudget(5))
+        assert written == [i * 2 for i in range(20)]
+
+    def test_should_skip_items_prepared_as_none(self):
+        written = []
+        run_pipeline(iter(range(6)), lambda i: i if i % 2 else None, written.append, lambda _: 1, ByteBudget(5))
+        assert written == [1, 3, 5]
+
+    def test_should_hold_at_most_budget_given_slow_writer(self):
+        budget = ByteBudget(25)
+        run_pipeline(iter(range(10)), lambda i: i, lambda _: time.sleep(0.01), lambda _: 10, budget)
+        assert budget.peak == 20
+        assert budget.used == 0
+
+    def test_should_let_item_larger_than_budget_through(self):
+        written = []
+        sizes = {"big": 100, "small": 1}
+        run_pipeline(iter(["big", "small"]), lambda s: s, written.append, sizes.get, ByteBudget(10))
+        assert written == ["big", "small"]
+
+    def test_should_raise_error_from_source(self):
+        def source():
+            yield 1
+            raise ValueError("fetch failed")
+
+        with pytest.raises(ValueError, match="fetch failed"):
+            run_pipeline(source(), lambda i: i, lambda _: None, lambda _: 1, ByteBudget(5))
+
+    def test_should_stop_stages_and_release_budget_given_write_error(self):
+        budget = ByteBudget(5)
+        closed = threading.Event()
+
+        def source():
+            try:
+                while True:
+                    yield 1
+            finally:
+                closed.set()
+
+        def write(_):
+            raise ValueError("write failed")
+
+        with pytest.raises(ValueError, match="write failed"):
+            run_pipeline(source(), lambda i: i, write, lambda _: 1, budget)
+        assert closed.is_set()
+        assert budget.used == 0
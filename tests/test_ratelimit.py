@@ -0,0 +1,89 @@
+# pylint: disable=no-self-use
+from unittest.mock import patch
+
+import pytest
+
+from tap_nikabot import rate_limiter
+from tap_nikabot.ratelimit import FileBackend, TokenBucket
+
+
+@pytest.fixture()
+def mock_time():
+    with patch("tap_nikabot.ratelimit.time") as mock:
+        mock.time.return_value = 1000.0
+        yield mock
+
+
+class TestTokenBucket:
+    # Each bucket's limit is its burst plus 60 a minute, so it refills at a token a second
+    def test_should_allow_burst_without_waiting(self, mock_time):
+        bucket = TokenBucket(63, 60, burst=3)
+        assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+        assert bucket.waits == 0
+
+    def test_should_space_requests_after_burst(self, mock_time):
+        bucket = TokenBucket(61, 60, burst=1)
+        assert [bucket.reserve() for _ in range(3)] == [0, 1.0, 2.0]
+        assert bucket.wait_seconds == 3.0
+        assert bucket.waits == 2
+
+    def test_should_refill_at_rate(self, mock_time):
+        bucket = TokenBucket(62, 60, burst=2)
+        bucket.reserve()
+        bucket.reserve()
+        mock_time.time.return_value = 1001.0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 1.0
+
+    def test_should_not_refill_past_burst(self, mock_time):
+        bucket = TokenBucket(61, 60, burst=1)
+        bucket.reserve()
+        mock_time.time.return_value = 2000.0
+        assert [bucket.reserve() for _ in range(2)] == [0, 1.0]
+
+    def test_should_sleep_for_wait(self, mock_time):
+        bucket = TokenBucket(61, 60, burst=1)
+        bucket.acquire()
+        bucket.acquire()
+        mock_time.sleep.assert_called_once_with(1.0)
+
+    def test_should_share_tokens_given_file_backend(self, mock_time, tmp_path):
+        path = str(tmp_path / "ratelimit")
+        first = TokenBucket(61, 60, burst=1, backend=FileBackend(path))
+        second = TokenBucket(61, 60, burst=1, backend=FileBackend(path))
+        assert first.reserve() == 0
+        assert second.reserve() == 1.0
+        assert first.reserve() == 2.0
+
+
+class TestRateLimiterConfig:
+    def test_should_default_to_small_burst(self):
+        assert rate_limiter({"access_token": "my-access-token"}).burst == 10
+        assert rate_limiter({"access_token": "my-access-token", "rate_limit": 10}).burst == 5
+
+    @pytest.mark.parametrize("burst", [None, 1, 100])
+    def test_should_stay_within_limit_in_first_period(self, mock_time, burst):
+        config = {
+            "access_token": "my-access-token",
+            "rate_limit": 250,
+            "rate_limit_period": 60,
+            "rate_limit_burst": burst,
+        }
+        bucket = rate_limiter(config)
+        waits = [bucket.reserve() for _ in range(300)]
+        assert len([wait for wait in waits if wait < 60]) <= 250
+
+    def test_should_raise_given_burst_not_less_than_limit(self):
+        with pytest.raises(ValueError):
+            rate_limiter({"access_token": "my-access-token", "rate_limit": 10, "rate_limit_burst": 10})
+
+    def test_should_use_file_backend(self, tmp_path):
+        path = str(tmp_path / "ratelimit")
+        config = {"access_token": "my-access-token", "rate_limit_backend": "file", "rate_limit_file": path}
+        bucket = rate_limiter(config)
+        assert isinstance(bucket.backend, FileBackend)
+        assert bucket.backend.path == path
+
+    def test_should_raise_given_invalid_backend(self):
+        with pytest.raises(ValueError, match="Invalid rate_limit_backend 'redis'"):
+            rate_limiter({"access_token": "my-access-token", "rate_limit_backend": "redis"})
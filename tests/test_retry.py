@@ -0,0 +1,115 @@
+# pylint: disable=no-self-use
+import io
+import json
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+from requests.exceptions import ChunkedEncodingError, ConnectionError as RequestsConnectionError, HTTPError
+
+from tap_nikabot.client import Client
+from tap_nikabot.retry import RetryPolicy, parse_retry_after
+
+TEAMS_RESPONSE = '{"ok":true,"result":[{"id":"5d6ca50762a07c00045125fb","domain":"pageup"}]}'
+TEAMS_URL = "https://api.nikabot.com/api/v1/teams"
+
+
+class TruncatedBody(io.BytesIO):
+    """A response body whose connection is reset after the first size bytes."""
+
+    def __init__(self, content, size):
+        super().__init__(content[:size])
+
+    def read(self, *args, **kwargs):
+        data = super().read(*args, **kwargs)
+        if not data:
+            raise ConnectionResetError("Connection reset by peer")
+        return data
+
+
+@pytest.fixture()
+def mock_sleep():
+    with patch("tap_nikabot.retry.time.sleep") as mock:
+        yield mock
+
+
+class TestRetryPolicy:
+    def test_should_not_retry_client_errors(self):
+        assert RetryPolicy().delay(1, 400, {}) is None
+        assert RetryPolicy().delay(1, 404, {}) is None
+
+    def test_should_retry_server_errors_with_jitter(self):
+        with patch("tap_nikabot.retry.random.uniform", return_value=1.5) as mock_uniform:
+            assert RetryPolicy(base_delay=1).delay(3, 503, {}) == 1.5
+        mock_uniform.assert_called_once_with(0, 4)
+
+    def test_should_cap_backoff(self):
+        with patch("tap_nikabot.retry.random.uniform") as mock_uniform:
+            RetryPolicy(max_tries=20, base_delay=1, max_delay=60).delay(10, None, {})
+        mock_uniform.assert_called_once_with(0, 60)
+
+    def test_should_honor_retry_after(self):
+        assert RetryPolicy().delay(1, 429, {"Retry-After": "7"}) == 7
+
+    def test_should_give_up_after_max_tries(self):
+        assert RetryPolicy(max_tries=3).delay(3, 500, {}) is None
+
+    def test_should_parse_retry_after_date(self):
+        with patch("tap_nikabot.retry.datetime", wraps=datetime) as mock_datetime:
+            mock_datetime.now.return_value = datetime(2020, 1, 1, tzinfo=timezone.utc)
+            assert parse_retry_after("Wed, 01 Jan 2020 00:00:30 GMT") == 30
+
+    def test_should_ignore_invalid_retry_after(self):
+        assert parse_retry_after("soon") is None
+
+
+class TestClientRetries:
+    def test_should_retry_rate_limited_request(self, requests_mock, mock_sleep):
+        requests_mock.get(
+            TEAMS_URL, [{"status_code": 429, "headers": {"Retry-After": "2"}}, {"text": TEAMS_RESPONSE}],
+        )
+        client = Client("my-access-token", "1000")
+        assert client.get("/api/v1/teams") == [{"id": "5d6ca50762a07c00045125fb", "domain": "pageup"}]
+        mock_sleep.assert_called_once_with(2.0)
+        assert client.retry_policy.retries == 1
+        assert client.retry_policy.backoff_seconds == 2.0
+
+    def test_should_fail_bad_request_without_retrying(self, requests_mock, mock_sleep):
+        requests_mock.get(TEAMS_URL, status_code=400)
+        with pytest.raises(HTTPError):
+            Client("my-access-token", "1000").get("/api/v1/teams")
+        assert requests_mock.call_count == 1
+        mock_sleep.assert_not_called()
+
+    def test_should_retry_connection_errors(self, requests_mock, mock_sleep):
+        requests_mock.get(TEAMS_URL, [{"exc": RequestsConnectionError}, {"text": TEAMS_RESPONSE}])
+        client = Client("my-access-token", "1000")
+        client.get("/api/v1/teams")
+        assert requests_mock.call_count == 2
+
+    def test_should_raise_after_max_tries(self, requests_mock, mock_sleep):
+        requests_mock.get(TEAMS_URL, status_code=500)
+        with pytest.raises(HTTPError):
+            Client("my-access-token", "1000", retry_policy=RetryPolicy(max_tries=3)).get("/api/v1/teams")
+        assert requests_mock.call_count == 3
+        assert mock_sleep.call_count == 2
+
+    def test_should_retry_streamed_page_which_fails_partway(self, requests_mock, mock_sleep):
+        url = "https://api.nikabot.com/api/v1/users?limit=1000&page=0"
+        content = json.dumps({"ok": True, "result": [{"id": str(i)} for i in range(5)]}).encode()
+        requests_mock.get(url, [{"body": TruncatedBody(content, len(content) // 2)}, {"content": content}])
+        client = Client("my-access-token", "1000", stream_pages=True)
+        with patch("tap_nikabot.client.STREAM_BATCH_SIZE", 1), patch("tap_nikabot.client.STREAM_CHUNK_SIZE", 8):
+            batches = list(client.stream_one_page(0, "/api/v1/users"))
+        assert [row["id"] for batch in batches for row in batch] == ["0", "1", "2", "3", "4"]
+        assert requests_mock.call_count == 2
+        assert client.retry_policy.retries == 1
+
+    def test_should_raise_given_streamed_page_fails_after_max_tries(self, requests_mock, mock_sleep):
+        url = "https://api.nikabot.com/api/v1/users?limit=1000&page=0"
+        content = json.dumps({"ok": True, "result": [{"id": "0"}]}).encode()
+        requests_mock.get(url, [{"body": TruncatedBody(content, 4)}, {"body": TruncatedBody(content, 4)}])
+        client = Client("my-access-token", "1000", retry_policy=RetryPolicy(max_tries=2), stream_pages=True)
+        with pytest.raises(ChunkedEncodingError):
+            list(client.stream_one_page(0, "/api/v1/users"))
+        assert requests_mock.call_count == 2
@@ -0,0 +1,61 @@
+# pylint: disable=no-self-use
+import copy
+import json
+from unittest.mock import patch
+
+from singer import resolve_schema_references
+
+from tap_nikabot.schemas import SwaggerSchemas, compile_swagger, save_swagger_schemas
+from tests.test_discover import SWAGGER_DEFINITION
+
+
+def load_swagger():
+    return json.loads(SWAGGER_DEFINITION)
+
+
+class TestSwaggerSchemas:
+    def test_should_resolve_same_as_singer(self):
+        swagger = load_swagger()
+        for name in ("RecordDTO", "ProjectDTO", "TeamDTO", "ApiResponse«List«RecordDTO»»"):
+            expected = resolve_schema_references({**copy.deepcopy(swagger["definitions"][name]), **swagger})
+            del expected["definitions"]
+            for key in ("swagger", "info", "host", "basePath", "tags", "paths", "securityDefinitions"):
+                del expected[key]
+            assert SwaggerSchemas(swagger).resolved(name) == expected
+
+    def test_should_not_modify_swagger(self):
+        swagger = load_swagger()
+        SwaggerSchemas(swagger).resolved("RecordDTO")
+        assert swagger == load_swagger()
+
+    def test_should_resolve_each_definition_once(self):
+        schemas = SwaggerSchemas(load_swagger())
+        with patch.object(schemas, "resolve", wraps=schemas.resolve) as mock_resolve:
+            schemas.resolved("ProjectDTO")
+            schemas.resolved("ProjectDTO")
+        # ProjectDTO, its properties, then Archived and Pto with their properties
+        assert mock_resolve.call_count == 21
+        assert schemas.resolved("ProjectDTO") is schemas.resolved("ProjectDTO")
+
+
+class TestCompileSwagger:
+    def test_should_reuse_schemas_for_same_document(self):
+        assert compile_swagger(load_swagger()) is compile_swagger(load_swagger())
+
+    def test_should_load_resolved_definitions_from_cache_dir(self, tmp_path):
+        swagger = load_swagger()
+        schemas = SwaggerSchemas(swagger)
+        schemas.resolved("RecordDTO")
+        save_swagger_schemas(schemas, str(tmp_path))
+        with patch("tap_nikabot.schemas._compiled", {}):
+            loaded = compile_swagger(swagger, str(tmp_path))
+        assert loaded.resolved_definitions == schemas.resolved_definitions
+
+    def test_should_ignore_cache_for_different_document(self, tmp_path):
+        swagger = load_swagger()
+        schemas = SwaggerSchemas(swagger)
+        schemas.resolved("RecordDTO")
+        save_swagger_schemas(schemas, str(tmp_path))
+        swagger["info"]["version"] = "Version v2"
+        with patch("tap_nikabot.schemas._compiled", {}):
+            assert compile_swagger(swagger, str(tmp_path)).resolved_definitions == {}
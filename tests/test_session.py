@@ -0,0 +1,61 @@
+# pylint: disable=no-self-use
+from unittest.mock import patch
+
+import pytest
+from requests.exceptions import ReadTimeout
+
+from tap_nikabot import connection_pool_size, http_session, timeout
+from tap_nikabot.client import Client
+
+TEAMS_RESPONSE = '{"ok":true,"result":[{"id":"5d6ca50762a07c00045125fb","domain":"pageup"}]}'
+TEAMS_URL = "https://api.nikabot.com/api/v1/teams"
+
+
+class TestSession:
+    def test_should_size_pool_to_concurrent_requests(self):
+        config = {"max_concurrent_requests": 4, "parallel_streams": 3, "records_window": "month"}
+        assert connection_pool_size(config) == 4 * 3 * 4
+
+    def test_should_not_size_pool_below_default(self):
+        assert connection_pool_size({}) == 10
+
+    def test_should_set_pool_size_on_adapter(self):
+        session = http_session({"max_concurrent_requests": 20})
+        assert session.get_adapter("https://api.nikabot.com")._pool_maxsize == 20  # pylint: disable=protected-access
+
+    def test_should_set_pool_size_on_http_adapter(self):
+        session = http_session({"max_concurrent_requests": 20})
+        assert session.get_adapter("http://localhost")._pool_maxsize == 20  # pylint: disable=protected-access
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {"max_concurrent_requests": 2, "stream_pages": True},
+            {"max_concurrent_requests": 2, "page_size_bounds": (100, 5000)},
+            {"stream_pages": True, "page_size_bounds": (100, 5000)},
+        ],
+    )
+    def test_should_raise_given_more_than_one_page_mode(self, options):
+        with pytest.raises(ValueError, match="can be used at once"):
+            Client("my-access-token", "1000", **options)
+
+    def test_should_not_request_compression_when_disabled(self):
+        assert http_session({"compress_responses": False}).headers["Accept-Encoding"] == "identity"
+
+    def test_should_send_timeouts(self, requests_mock):
+        requests_mock.get(TEAMS_URL, text=TEAMS_RESPONSE)
+        config = {"connect_timeout": 5, "read_timeout": 30}
+        Client("my-access-token", "1000", timeout=timeout(config)).get("/api/v1/teams")
+        assert requests_mock.last_request.timeout == (5, 30)
+
+    def test_should_retry_timeouts(self, requests_mock):
+        requests_mock.get(TEAMS_URL, [{"exc": ReadTimeout}, {"text": TEAMS_RESPONSE}])
+        with patch("tap_nikabot.retry.time.sleep"):
+            Client("my-access-token", "1000").get("/api/v1/teams")
+        assert requests_mock.call_count == 2
+
+    def test_should_reuse_session_between_clients(self):
+        session = http_session({})
+        first = Client("my-access-token", "1000", session=session)
+        second = Client("my-access-token", "1000", session=session)
+        assert first.session is second.session
@@ -0,0 +1,42 @@
+# pylint: disable=no-self-use
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+import tap_nikabot
+from tap_nikabot import streams
+from tap_nikabot.streams.records import Records
+
+
+class TestStartup:
+    def test_should_not_import_unused_modules(self):
+        code = (
+            "import sys, tap_nikabot; print(sorted(m for m in sys.modules if m.split('.')[0] in "
+            "('asyncio', 'backoff', 'concurrent', 'dateutil', 'pkg_resources', 'requests', 'singer', 'urllib3') "
+            "or m.startswith('tap_nikabot.streams.')))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], check=True, stdout=subprocess.PIPE, universal_newlines=True
+        )
+        assert result.stdout == "[]\n"
+
+    def test_should_not_import_singer_given_version(self):
+        code = (
+            "import sys, tap_nikabot\nsys.argv[1:] = ['--version']\n"
+            "try:\n    tap_nikabot.main()\nfinally:\n    print('singer' in sys.modules)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], check=True, stdout=subprocess.PIPE, universal_newlines=True
+        )
+        assert result.stdout == f"-c v{tap_nikabot.version()}\nFalse\n"
+
+    def test_should_load_streams_by_id(self):
+        assert streams.get("records") is Records
+        assert [s.stream_id for s in streams.get_all()] == streams.stream_ids
+
+    def test_should_print_version(self, capsys):
+        with patch.object(sys, "argv", ["tap-nikabot", "--version"]), pytest.raises(SystemExit):
+            tap_nikabot.parse_args()
+        assert capsys.readouterr().out == f"tap-nikabot v{tap_nikabot.__version__}\n"
@@ -0,0 +1,79 @@
+# pylint: disable=no-self-use
+import json
+from unittest.mock import patch
+
+import pytest
+
+from tap_nikabot import discover
+from tap_nikabot.errors import SwaggerNotCachedError
+from tests.test_discover import SWAGGER_DEFINITION
+
+SWAGGER_URL = "https://api.nikabot.com/v2/api-docs?group=public"
+FIRST_MODIFIED = "Wed, 01 Jan 2020 00:00:00 GMT"
+SECOND_MODIFIED = "Thu, 02 Jan 2020 00:00:00 GMT"
+
+
+@pytest.fixture()
+def mock_time():
+    with patch("tap_nikabot.swagger_cache.time") as mock:
+        mock.time.return_value = 1000.0
+        yield mock
+
+
+@pytest.fixture()
+def config(tmp_path):
+    return {"swagger_cache": True, "swagger_cache_dir": str(tmp_path), "swagger_cache_ttl": 60}
+
+
+class TestSwaggerCache:
+    def test_should_use_cached_definition_within_ttl(self, requests_mock, mock_time, config):
+        requests_mock.get(SWAGGER_URL, text=SWAGGER_DEFINITION)
+        discover(config)
+        mock_time.time.return_value = 1059.0
+        catalog = discover(config)
+        assert len(catalog.streams) == 6
+        assert requests_mock.call_count == 1
+
+    def test_should_revalidate_expired_definition(self, requests_mock, mock_time, config):
+        requests_mock.get(SWAGGER_URL, text=SWAGGER_DEFINITION, headers={"ETag": '"v1"'})
+        discover(config)
+        requests_mock.get(SWAGGER_URL, status_code=304)
+        mock_time.time.return_value = 1060.0
+        catalog = discover(config)
+        assert len(catalog.streams) == 6
+        assert requests_mock.last_request.headers["If-None-Match"] == '"v1"'
+
+    def test_should_replace_changed_definition(self, requests_mock, mock_time, config, tmp_path):
+        requests_mock.get(SWAGGER_URL, text=SWAGGER_DEFINITION, headers={"Last-Modified": FIRST_MODIFIED})
+        discover(config)
+        requests_mock.get(SWAGGER_URL, text=SWAGGER_DEFINITION, headers={"Last-Modified": SECOND_MODIFIED})
+        mock_time.time.return_value = 1060.0
+        discover(config)
+        assert requests_mock.last_request.headers["If-Modified-Since"] == FIRST_MODIFIED
+        cached = json.loads((tmp_path / "swagger.json").read_text())
+        assert cached["last_modified"] == SECOND_MODIFIED
+        assert cached["fetched_at"] == 1060.0
+
+    def test_should_use_expired_definition_when_offline(self, requests_mock, mock_time, config):
+        requests_mock.get(SWAGGER_URL, text=SWAGGER_DEFINITION)
+        discover(config)
+        mock_time.time.return_value = 100000.0
+        catalog = discover(dict(config, offline=True))
+        assert len(catalog.streams) == 6
+        assert requests_mock.call_count == 1
+
+    def test_should_raise_when_offline_without_cache(self, requests_mock, config):
+        with pytest.raises(SwaggerNotCachedError):
+            discover(dict(config, offline=True))
+        assert requests_mock.call_count == 0
+
+    def test_should_not_cache_by_default(self, requests_mock, tmp_path):
+        requests_mock.get(SWAGGER_URL, text=SWAGGER_DEFINITION)
+        discover({"swagger_cache_dir": str(tmp_path)})
+        assert not (tmp_path / "swagger.json").exists()
+
+    def test_should_store_resolved_schemas(self, requests_mock, mock_time, config, tmp_path):
+        requests_mock.get(SWAGGER_URL, text=SWAGGER_DEFINITION)
+        discover(config)
+        cached = json.loads((tmp_path / "schemas.json").read_text())
+        assert "RecordDTO" in cached["definitions"]
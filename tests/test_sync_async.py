@@ -0,0 +1,139 @@
+# pylint: disable=redefined-outer-name, no-self-use
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from requests.exceptions import HTTPError
+from singer.catalog import Catalog, CatalogEntry
+from singer.schema import Schema
+
+from tap_nikabot import sync
+from tap_nikabot.async_client import AsyncClient, Transport, TransportResponse
+from tap_nikabot.retry import RetryPolicy
+
+EMPTY_RESPONSE = '{"ok":true,"result":[]}'
+USERS_RESPONSE = '{"ok":true,"result":[{"id":"5de459977292020014fb601c","name":"Billy"},{"id":"68QMxnnt8YcpPdfmM","name":"paul.heasley"}]}'
+ROLES_RESPONSE = '{"ok":true,"result":[{"id":"d893ebf32d49c35c1c5c5b21","name":"Lead","team_id":"T034F9NPW"}]}'
+TEAMS_RESPONSE = '{"ok":true,"result":[{"id":"5d6ca50762a07c00045125fb","domain":"pageup"}]}'
+
+
+class StubTransport(Transport):
+    """Serves canned responses keyed by path and page number, tracking how many requests are in flight at once."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def request(self, method, url, headers, params):
+        self.requests.append((url, params))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # Let other tasks run while this request is "on the network"
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        path = url.replace("https://api.nikabot.com", "")
+        key = (path, params["page"]) if params else (path, None)
+        response = self.responses.get(key, (200, EMPTY_RESPONSE))
+        # A list of responses is served in order
+        status_code, body = response.pop(0) if isinstance(response, list) else response
+        return TransportResponse(status_code, {}, body.encode("utf-8"))
+
+
+def make_catalog(*stream_ids):
+    return Catalog(
+        streams=[
+            CatalogEntry(
+                tap_stream_id=stream_id,
+                stream=stream_id,
+                schema=Schema.from_dict({}),
+                key_properties=["id"],
+                metadata=[{"breadcrumb": [], "metadata": {"selected": True}}],
+            )
+            for stream_id in stream_ids
+        ]
+    )
+
+
+@pytest.fixture(autouse=True)
+def enable_event_loop(socket_enabled):  # pylint: disable=unused-argument
+    """The event loop needs a local socket pair, requests still never reach the network."""
+    yield
+
+
+@pytest.fixture()
+def stub_transport():
+    transport = StubTransport(
+        {
+            ("/api/v1/users", "0"): (200, USERS_RESPONSE),
+            ("/api/v1/roles", "0"): (200, ROLES_RESPONSE),
+            ("/api/v1/teams", None): (200, TEAMS_RESPONSE),
+        }
+    )
+    with patch("tap_nikabot.async_client.RequestsTransport", return_value=transport):
+        yield transport
+
+
+class TestSyncAsync:
+    def test_should_output_records_for_all_streams(self, mock_stdout, stub_transport):
+        config = {"access_token": "my-access-token", "page_size": 1000, "use_asyncio": True}
+        sync(config, {}, make_catalog("users", "roles", "teams"))
+        messages = [json.loads(c.args[0]) for c in mock_stdout.mock_calls]
+        for stream_id, count in [("users", 2), ("roles", 1), ("teams", 1)]:
+            stream_messages = [m for m in messages if m["stream"] == stream_id]
+            assert stream_messages[0]["type"] == "SCHEMA"
+            assert [m["type"] for m in stream_messages[1:]] == ["RECORD"] * count
+
+    def test_should_request_streams_concurrently(self, mock_stdout, stub_transport):
+        config = {"access_token": "my-access-token", "page_size": 1000, "use_asyncio": True}
+        sync(config, {}, make_catalog("users", "roles", "teams"))
+        assert stub_transport.max_in_flight == 3
+
+    def test_should_collect_metrics_of_each_stream(self, mock_stdout, stub_transport):
+        config = {"access_token": "my-access-token", "page_size": 1000, "use_asyncio": True, "metrics": True}
+        with patch("tap_nikabot.stream_sync.metrics.log_metrics") as log_metrics:
+            sync(config, {}, make_catalog("users", "roles", "teams"))
+        requests = {c.args[0].stream_id: c.args[0].requests for c in log_metrics.mock_calls}
+        assert requests == {"users": 2, "roles": 2, "teams": 1}
+
+    def test_should_output_records_given_requests_transport(self, mock_stdout, requests_mock):
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=0", text=USERS_RESPONSE)
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=1", text=EMPTY_RESPONSE)
+        config = {"access_token": "my-access-token", "page_size": 1000, "use_asyncio": True}
+        sync(config, {}, make_catalog("users"))
+        assert [json.loads(c.args[0])["type"] for c in mock_stdout.mock_calls] == ["SCHEMA", "RECORD", "RECORD"]
+
+    def test_should_send_requests_on_thread_for_every_connection(self, mock_stdout, stub_transport):
+        config = {
+            "access_token": "my-access-token",
+            "page_size": 1000,
+            "use_asyncio": True,
+            "max_concurrent_requests": 4,
+        }
+        with patch("tap_nikabot.async_client.RequestsTransport", return_value=stub_transport) as transport_class:
+            sync(config, {}, make_catalog("users"))
+        executor = transport_class.call_args.args[2]
+        # max_concurrent_requests for each of the six streams
+        assert executor._max_workers == 24  # pylint: disable=protected-access
+
+    def test_should_retry_server_errors(self):
+        transport = StubTransport({("/api/v1/teams", None): [(500, ""), (200, TEAMS_RESPONSE)]})
+        client = AsyncClient("my-access-token", "1000", transport=transport, retry_policy=RetryPolicy(base_delay=0))
+        loop = asyncio.new_event_loop()
+        result = loop.run_until_complete(client.get("/api/v1/teams"))
+        loop.close()
+        assert result == json.loads(TEAMS_RESPONSE)["result"]
+        assert len(transport.requests) == 2
+        assert client.retry_policy.retries == 1
+
+    def test_should_not_retry_client_errors(self):
+        transport = StubTransport({("/api/v1/teams", None): [(404, ""), (200, TEAMS_RESPONSE)]})
+        client = AsyncClient("my-access-token", "1000", transport=transport)
+        loop = asyncio.new_event_loop()
+        with pytest.raises(HTTPError, match="404 Error"):
+            loop.run_until_complete(client.get("/api/v1/teams"))
+        loop.close()
+        assert len(transport.requests) == 1
@@ -3,6 +3,7 @@ import json
 import logging
 from unittest.mock import call
 
+import pytest
 from singer.catalog import Catalog, CatalogEntry
 from singer.schema import Schema
 
@@ -14,6 +15,7 @@ GROUPS_RESPONSE = '{"ok":true,"result":[{"id":"f1b4b37cc2658672770b789f","team_i
 
 
 class TestSyncGroups:
+    @pytest.mark.usefixtures("mock_json_backend")
     def test_should_output_records(self, mock_stdout, requests_mock):
         requests_mock.get("https://api.nikabot.com/api/v1/groups?limit=1000&page=0", json=json.loads(GROUPS_RESPONSE))
         requests_mock.get("https://api.nikabot.com/api/v1/groups?limit=1000&page=1", json=json.loads(EMPTY_RESPONSE))
@@ -0,0 +1,62 @@
+# pylint: disable=no-self-use
+import json
+
+import pytest
+from singer.catalog import Catalog, CatalogEntry
+from singer.schema import Schema
+
+from tap_nikabot import sync
+from tap_nikabot.errors import ServerError
+
+EMPTY_RESPONSE = '{"ok":true,"result":[]}'
+USERS_RESPONSE = '{"ok":true,"result":[{"id":"5de459977292020014fb601c","name":"Billy"},{"id":"68QMxnnt8YcpPdfmM","name":"paul.heasley"}]}'
+ROLES_RESPONSE = '{"ok":true,"result":[{"id":"d893ebf32d49c35c1c5c5b21","name":"Lead","team_id":"T034F9NPW"}]}'
+TEAMS_RESPONSE = '{"ok":true,"result":[{"id":"5d6ca50762a07c00045125fb","domain":"pageup"}]}'
+
+
+def make_catalog(*stream_ids):
+    return Catalog(
+        streams=[
+            CatalogEntry(
+                tap_stream_id=stream_id,
+                stream=stream_id,
+                schema=Schema.from_dict({}),
+                key_properties=["id"],
+                metadata=[{"breadcrumb": [], "metadata": {"selected": True}}],
+            )
+            for stream_id in stream_ids
+        ]
+    )
+
+
+class TestSyncParallel:
+    def test_should_output_schema_before_records_for_each_stream(self, mock_stdout, requests_mock):
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=0", text=USERS_RESPONSE)
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=1", text=EMPTY_RESPONSE)
+        requests_mock.get("https://api.nikabot.com/api/v1/roles?limit=1000&page=0", text=ROLES_RESPONSE)
+        requests_mock.get("https://api.nikabot.com/api/v1/roles?limit=1000&page=1", text=EMPTY_RESPONSE)
+        requests_mock.get("https://api.nikabot.com/api/v1/teams", text=TEAMS_RESPONSE)
+        config = {"access_token": "my-access-token", "page_size": 1000, "parallel_streams": 3}
+        sync(config, {}, make_catalog("users", "roles", "teams"))
+        messages = [json.loads(c.args[0]) for c in mock_stdout.mock_calls]
+        assert len(messages) == 7
+        for stream_id, count in [("users", 2), ("roles", 1), ("teams", 1)]:
+            stream_messages = [m for m in messages if m["stream"] == stream_id]
+            assert stream_messages[0]["type"] == "SCHEMA"
+            assert [m["type"] for m in stream_messages[1:]] == ["RECORD"] * count
+
+    def test_should_write_whole_messages_given_buffered_output(self, mock_stdout, requests_mock):
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=0", text=USERS_RESPONSE)
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=1", text=EMPTY_RESPONSE)
+        requests_mock.get("https://api.nikabot.com/api/v1/teams", text=TEAMS_RESPONSE)
+        config = {"access_token": "my-access-token", "page_size": 1000, "parallel_streams": 2, "output_buffer_size": 64}
+        sync(config, {}, make_catalog("users", "teams"))
+        lines = "".join(c.args[0] for c in mock_stdout.mock_calls).splitlines()
+        assert sorted(json.loads(line)["type"] for line in lines) == ["RECORD", "RECORD", "RECORD", "SCHEMA", "SCHEMA"]
+
+    def test_should_raise_error_from_stream(self, mock_stdout, requests_mock):
+        requests_mock.get("https://api.nikabot.com/api/v1/teams", text='{"ok":false,"message":"Broken"}')
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=0", text=EMPTY_RESPONSE)
+        config = {"access_token": "my-access-token", "page_size": 1000, "parallel_streams": 2}
+        with pytest.raises(ServerError, match="Broken"):
+            sync(config, {}, make_catalog("users", "teams"))
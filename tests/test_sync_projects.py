@@ -3,6 +3,7 @@ import json
 import logging
 from unittest.mock import call
 
+import pytest
 from singer.catalog import Catalog, CatalogEntry
 from singer.schema import Schema
 
@@ -14,6 +15,7 @@ PROJECTS_RESPONSE = '{"ok":true,"result":[{"id":"5d6ca95e62a07c00045126e7","proj
 
 
 class TestSyncProjects:
+    @pytest.mark.usefixtures("mock_json_backend")
     def test_should_output_records(self, mock_stdout, requests_mock):
         requests_mock.get(
             "https://api.nikabot.com/api/v1/projects?limit=1000&page=0", json=json.loads(PROJECTS_RESPONSE)
@@ -1,15 +1,19 @@
 # pylint: disable=redefined-outer-name, no-self-use
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from unittest.mock import call, patch
 
 import pytest
+from singer import metadata
 from singer.catalog import Catalog, CatalogEntry
 from singer.schema import Schema
 
 from tap_nikabot import sync
+from tap_nikabot.client import Client
 from tap_nikabot.errors import InvalidReplicationMethodError, StartDateAfterEndDateError
+from tap_nikabot.streams.records import Records, split_date_range
 
 LOGGER = logging.getLogger()
 EMPTY_RESPONSE = '{"ok":true,"result":[]}'
@@ -45,6 +49,7 @@ def mock_catalog():
 
 
 class TestSyncRecords:
+    @pytest.mark.usefixtures("mock_json_backend")
     def test_should_output_records_given_default_config(self, mock_stdout, requests_mock, mock_catalog):
         requests_mock.get(
             "https://api.nikabot.com/api/v1/records?limit=1000&page=0&dateStart=00010101&dateEnd=99991231",
@@ -67,6 +72,7 @@ class TestSyncRecords:
             ),
         ]
 
+    @pytest.mark.usefixtures("mock_json_backend")
     def test_should_output_multiple_pages(self, mock_stdout, requests_mock, mock_catalog):
         requests_mock.get(
             "https://api.nikabot.com/api/v1/records?limit=1000&page=0&dateStart=00010101&dateEnd=99991231",
@@ -99,6 +105,63 @@ class TestSyncRecords:
             ),
         ]
 
+    def test_should_build_metadata_map_once_per_stream(self, mock_stdout, requests_mock, mock_catalog):
+        url = "https://api.nikabot.com/api/v1/records?limit=1000&page={}&dateStart=00010101&dateEnd=99991231"
+        requests_mock.get(url.format(0), json=json.loads(RECORDS_RESPONSE))
+        requests_mock.get(url.format(1), json=json.loads(RECORDS_PAGE2_RESPONSE))
+        requests_mock.get(url.format(2), json=json.loads(EMPTY_RESPONSE))
+        config = {"access_token": "my-access-token", "page_size": 1000}
+        state = {}
+        with patch("tap_nikabot.stream_sync.metadata.to_map", wraps=metadata.to_map) as mock_to_map:
+            sync(config, state, mock_catalog)
+        assert len(mock_stdout.mock_calls) == 5
+        # Once when checking the stream is selected and once for transforming all of its records
+        assert mock_to_map.call_count == 2
+
+    def test_should_output_pages_in_order_given_concurrent_requests(self, mock_stdout, requests_mock, mock_catalog):
+        url = "https://api.nikabot.com/api/v1/records?limit=1000&page={}&dateStart=00010101&dateEnd=99991231"
+        requests_mock.get(url.format(0), json=json.loads(RECORDS_RESPONSE))
+        requests_mock.get(url.format(1), json=json.loads(RECORDS_PAGE2_RESPONSE))
+        requests_mock.get(url.format(2), json=json.loads(EMPTY_RESPONSE))
+        requests_mock.get(url.format(3), json=json.loads(EMPTY_RESPONSE))
+        requests_mock.get(url.format(4), json=json.loads(EMPTY_RESPONSE))
+        config = {"access_token": "my-access-token", "page_size": 1000, "max_concurrent_requests": 3}
+        state = {}
+        sync(config, state, mock_catalog)
+        record_ids = [json.loads(c.args[0])["record"]["id"] for c in mock_stdout.mock_calls[1:]]
+        assert record_ids == [
+            "5ee2ca823e056d00141896a0",
+            "5ee1d52e5cff9100146de745",
+            "5d9d7a035da6700004970476",
+            "5d9d79c45da6700004970475",
+        ]
+        # At most max_concurrent_requests - 1 requests are sent past the first empty page
+        assert not any("page=5" in r.url for r in requests_mock.request_history)
+
+    def test_should_keep_page_cursor_aligned_given_adaptive_page_size(self, mock_stdout, requests_mock, mock_catalog):
+        url = "https://api.nikabot.com/api/v1/records?limit={}&page={}&dateStart=00010101&dateEnd=99991231"
+        requests_mock.get(url.format(2, 0), json=json.loads(RECORDS_RESPONSE))
+        requests_mock.get(url.format(2, 1), json=json.loads(RECORDS_PAGE2_RESPONSE))
+        requests_mock.get(url.format(4, 1), json=json.loads(EMPTY_RESPONSE))
+        config = {
+            "access_token": "my-access-token",
+            "page_size": 2,
+            "adaptive_page_size": True,
+            "min_page_size": 1,
+            "max_page_size": 4,
+        }
+        state = {}
+        # Every page takes one second
+        with patch("tap_nikabot.client.time.perf_counter", side_effect=range(100)):
+            sync(config, state, mock_catalog)
+        assert [(r.qs["limit"], r.qs["page"]) for r in requests_mock.request_history] == [
+            (["2"], ["0"]),
+            (["2"], ["1"]),
+            (["4"], ["1"]),
+        ]
+        assert len(mock_stdout.mock_calls) == 5
+
+    @pytest.mark.usefixtures("mock_json_backend")
     def test_should_use_start_and_end_dates_given_config_set(self, mock_stdout, requests_mock, mock_catalog):
         requests_page0 = requests_mock.get(
             "https://api.nikabot.com/api/v1/records?limit=1000&page=0&dateStart=20200101&dateEnd=20200501",
@@ -128,6 +191,222 @@ class TestSyncRecords:
             ),
         ]
 
+    def test_should_output_windows_in_order_given_records_window(self, mock_stdout, requests_mock, mock_catalog):
+        url = "https://api.nikabot.com/api/v1/records?limit=1000&page={}&dateStart={}&dateEnd={}"
+        requests_mock.get(url.format(0, "20200101", "20200131"), json=json.loads(RECORDS_RESPONSE))
+        requests_mock.get(url.format(1, "20200101", "20200131"), json=json.loads(EMPTY_RESPONSE))
+        requests_mock.get(url.format(0, "20200201", "20200229"), json=json.loads(EMPTY_RESPONSE))
+        requests_mock.get(url.format(0, "20200301", "20200310"), json=json.loads(RECORDS_PAGE2_RESPONSE))
+        requests_mock.get(url.format(1, "20200301", "20200310"), json=json.loads(EMPTY_RESPONSE))
+        config = {
+            "access_token": "my-access-token",
+            "page_size": 1000,
+            "start_date": "2020-01-01",
+            "end_date": "2020-03-10",
+            "records_window": "month",
+            "records_window_workers": 3,
+        }
+        state = {}
+        sync(config, state, mock_catalog)
+        record_ids = [json.loads(c.args[0])["record"]["id"] for c in mock_stdout.mock_calls[1:]]
+        assert record_ids == [
+            "5ee2ca823e056d00141896a0",
+            "5ee1d52e5cff9100146de745",
+            "5d9d7a035da6700004970476",
+            "5d9d79c45da6700004970475",
+        ]
+
+    def test_should_write_checkpoint_given_checkpoint_interval(self, mock_stdout, requests_mock, mock_catalog):
+        url = "https://api.nikabot.com/api/v1/records?limit=2&page={}&dateStart=00010101&dateEnd=99991231"
+        requests_mock.get(url.format(0), json=json.loads(RECORDS_RESPONSE))
+        requests_mock.get(url.format(1), json=json.loads(RECORDS_PAGE2_RESPONSE))
+        requests_mock.get(url.format(2), json=json.loads(EMPTY_RESPONSE))
+        config = {"access_token": "my-access-token", "page_size": 2, "checkpoint_interval": 1}
+        sync(config, {}, mock_catalog)
+        states = [json.loads(c.args[0])["value"] for c in mock_stdout.mock_calls if '"STATE"' in c.args[0]]
+        checkpoint = {"window_start": "0001-01-01", "window_end": "9999-12-31", "max_bookmark": None}
+        assert states == [
+            {"checkpoints": {"records": dict(checkpoint, offset=2)}},
+            {"checkpoints": {"records": dict(checkpoint, offset=4)}},
+            {},
+        ]
+
+    def test_should_output_same_messages_given_max_inflight_bytes(self, mock_stdout, requests_mock, mock_catalog):
+        url = "https://api.nikabot.com/api/v1/records?limit=2&page={}&dateStart=00010101&dateEnd=99991231"
+        requests_mock.get(url.format(0), json=json.loads(RECORDS_RESPONSE))
+        requests_mock.get(url.format(1), json=json.loads(RECORDS_PAGE2_RESPONSE))
+        requests_mock.get(url.format(2), json=json.loads(EMPTY_RESPONSE))
+        config = {"access_token": "my-access-token", "page_size": 2, "checkpoint_interval": 1}
+        sync(config, {}, mock_catalog)
+        expected = mock_stdout.mock_calls
+        mock_stdout.reset_mock()
+        sync(dict(config, max_inflight_bytes=1000, pipeline_queue_size=1), {}, mock_catalog)
+        assert mock_stdout.mock_calls == expected
+
+    @pytest.mark.parametrize("max_inflight_bytes", [0, 1000])
+    def test_should_output_same_messages_given_transform_processes(
+        self, mock_stdout, requests_mock, mock_catalog, max_inflight_bytes
+    ):
+        url = "https://api.nikabot.com/api/v1/records?limit=2&page={}&dateStart=00010101&dateEnd=99991231"
+        requests_mock.get(url.format(0), json=json.loads(RECORDS_RESPONSE))
+        requests_mock.get(url.format(1), json=json.loads(RECORDS_PAGE2_RESPONSE))
+        requests_mock.get(url.format(2), json=json.loads(EMPTY_RESPONSE))
+        config = {"access_token": "my-access-token", "page_size": 2, "checkpoint_interval": 1}
+        sync(config, {}, mock_catalog)
+        expected = [json.loads(c.args[0]) for c in mock_stdout.mock_calls]
+        mock_stdout.reset_mock()
+        sync(dict(config, transform_processes=2, max_inflight_bytes=max_inflight_bytes), {}, mock_catalog)
+        # Worker processes format with the fastest JSON backend installed, so messages are compared once parsed
+        assert [json.loads(c.args[0]) for c in mock_stdout.mock_calls] == expected
+
+    def test_should_enrich_records_given_enrich_records(self, mock_stdout, requests_mock, mock_catalog):
+        url = "https://api.nikabot.com/api/v1/{}?limit=1000&page={}"
+        requests_mock.get(
+            url.format("users", 0), json={"ok": True, "result": [{"user_id": "UBM1DQ9RB", "name": "paul.heasley"}]}
+        )
+        requests_mock.get(url.format("users", 1), json=json.loads(EMPTY_RESPONSE))
+        requests_mock.get(
+            "https://api.nikabot.com/api/v1/teams",
+            json={"ok": True, "result": [{"platform_id": "T034F9NPW", "domain": "pageup"}]},
+        )
+        requests_mock.get(
+            url.format("projects", 0),
+            json={"ok": True, "result": [{"id": "5d6ca9e462a07c00045126ed", "client": "Internal"}]},
+        )
+        requests_mock.get(url.format("projects", 1), json=json.loads(EMPTY_RESPONSE))
+        records_url = url.format("records", "{}") + "&dateStart=00010101&dateEnd=99991231"
+        requests_mock.get(records_url.format(0), json=json.loads(RECORDS_RESPONSE))
+        requests_mock.get(records_url.format(1), json=json.loads(EMPTY_RESPONSE))
+        config = {"access_token": "my-access-token", "page_size": 1000, "enrich_records": True}
+        sync(config, {}, mock_catalog)
+        messages = [json.loads(c.args[0]) for c in mock_stdout.mock_calls]
+        assert messages[0]["schema"]["properties"]["user_name"] == {"type": ["null", "string"]}
+        enriched = [{k: m["record"][k] for k in ("user_name", "team_domain", "project_client")} for m in messages[1:]]
+        assert enriched == [
+            {"user_name": "paul.heasley", "team_domain": "pageup", "project_client": "Internal"},
+            {"user_name": None, "team_domain": "pageup", "project_client": None},
+        ]
+
+    @pytest.mark.parametrize(
+        "paging_config",
+        [
+            {},
+            {"max_concurrent_requests": 2},
+            {"stream_pages": True},
+            {"adaptive_page_size": True, "min_page_size": 2, "max_page_size": 2},
+        ],
+    )
+    def test_should_resume_from_checkpoint(self, mock_stdout, requests_mock, mock_catalog, paging_config):
+        url = "https://api.nikabot.com/api/v1/records?limit=2&page={}&dateStart=00010101&dateEnd=99991231"
+        requests_mock.get(url.format(0), json=json.loads(RECORDS_RESPONSE))
+        requests_mock.get(url.format(1), json=json.loads(RECORDS_PAGE2_RESPONSE))
+        requests_mock.get(url.format(2), json=json.loads(EMPTY_RESPONSE))
+        requests_mock.get(url.format(3), json=json.loads(EMPTY_RESPONSE))
+        config = {"access_token": "my-access-token", "page_size": 2, **paging_config}
+        checkpoint = {"window_start": "0001-01-01", "window_end": "9999-12-31", "offset": 3, "max_bookmark": None}
+        sync(config, {"checkpoints": {"records": checkpoint}}, mock_catalog)
+        messages = [json.loads(c.args[0]) for c in mock_stdout.mock_calls]
+        assert [m["record"]["id"] for m in messages if m["type"] == "RECORD"] == ["5d9d79c45da6700004970475"]
+        assert messages[-1] == {"type": "STATE", "value": {}}
+        assert "page=0" not in requests_mock.request_history[0].url
+
+    def test_should_resume_from_checkpoint_window(self, mock_stdout, requests_mock, mock_catalog):
+        url = "https://api.nikabot.com/api/v1/records?limit=1000&page={}&dateStart={}&dateEnd={}"
+        requests_mock.get(url.format(0, "20200201", "20200229"), json=json.loads(EMPTY_RESPONSE))
+        requests_mock.get(url.format(0, "20200301", "20200310"), json=json.loads(RECORDS_PAGE2_RESPONSE))
+        requests_mock.get(url.format(1, "20200301", "20200310"), json=json.loads(EMPTY_RESPONSE))
+        config = {
+            "access_token": "my-access-token",
+            "page_size": 1000,
+            "start_date": "2020-01-01",
+            "end_date": "2020-03-10",
+            "records_window": "month",
+        }
+        checkpoint = {"window_start": "2020-02-01", "window_end": "2020-02-29", "offset": 0}
+        sync(config, {"checkpoints": {"records": checkpoint}}, mock_catalog)
+        assert not any("dateStart=20200101" in r.url for r in requests_mock.request_history)
+        record_ids = [json.loads(c.args[0])["record"]["id"] for c in mock_stdout.mock_calls[1:-1]]
+        assert record_ids == ["5d9d7a035da6700004970476", "5d9d79c45da6700004970475"]
+
+    @pytest.mark.usefixtures("mock_json_backend")
+    def test_should_keep_bookmark_from_checkpoint_given_incremental_replication(
+        self, mock_stdout, requests_mock, mock_catalog
+    ):
+        url = "https://api.nikabot.com/api/v1/records?limit=1000&page={}&dateStart=20190801&dateEnd=99991231"
+        requests_mock.get(url.format(0), json=json.loads(RECORDS_PAGE2_RESPONSE))
+        requests_mock.get(url.format(1), json=json.loads(EMPTY_RESPONSE))
+        config = {"access_token": "my-access-token", "page_size": 1000}
+        checkpoint = {
+            "window_start": "2019-08-01",
+            "window_end": "9999-12-31",
+            "offset": 0,
+            "max_bookmark": "2020-06-10T00:00:00",
+        }
+        state = {"records": "2019-08-01T00:00:00", "checkpoints": {"records": checkpoint}}
+        mock_catalog.streams[0].replication_key = "date"
+        mock_catalog.streams[0].replication_method = "INCREMENTAL"
+        sync(config, state, mock_catalog)
+        assert mock_stdout.mock_calls[-1] == call('{"type": "STATE", "value": {"records": "2020-06-10T00:00:00"}}\n')
+
+    def test_should_fetch_records_after_today_given_records_window_without_end_date(
+        self, mock_stdout, requests_mock, mock_catalog
+    ):
+        url = "https://api.nikabot.com/api/v1/records?limit=1000&page={}&dateStart={}&dateEnd={}"
+        requests_mock.get(url.format(0, "20191230", "20200101"), json=json.loads(RECORDS_PAGE2_RESPONSE))
+        requests_mock.get(url.format(1, "20191230", "20200101"), json=json.loads(EMPTY_RESPONSE))
+        requests_mock.get(url.format(0, "20200102", "99991231"), json=json.loads(RECORDS_RESPONSE))
+        requests_mock.get(url.format(1, "20200102", "99991231"), json=json.loads(EMPTY_RESPONSE))
+        config = {
+            "access_token": "my-access-token",
+            "page_size": 1000,
+            "start_date": "2019-12-30",
+            "records_window": "week",
+        }
+        sync(config, {}, mock_catalog)
+        record_ids = [json.loads(c.args[0])["record"]["id"] for c in mock_stdout.mock_calls[1:]]
+        assert record_ids == [
+            "5d9d7a035da6700004970476",
+            "5d9d79c45da6700004970475",
+            "5ee2ca823e056d00141896a0",
+            "5ee1d52e5cff9100146de745",
+        ]
+
+    def test_should_start_no_more_windows_than_workers(self, requests_mock):
+        url = "https://api.nikabot.com/api/v1/records?limit=1000&page={}&dateStart={}&dateEnd={}"
+        days = [f"201912{day:02}" for day in range(20, 26)]
+        requests_mock.get(url.format(0, days[0], days[0]), json=json.loads(RECORDS_RESPONSE))
+        for day in days:
+            requests_mock.get(url.format(1 if day == days[0] else 0, day, day), json=json.loads(EMPTY_RESPONSE))
+        config = {
+            "start_date": "2019-12-20",
+            "end_date": "2019-12-25",
+            "records_window": "day",
+            "records_window_workers": 2,
+        }
+        with patch(
+            "tap_nikabot.streams.records.ThreadPoolExecutor.submit",
+            autospec=True,
+            side_effect=ThreadPoolExecutor.submit,
+        ) as mock_submit:
+            pages = Records().get_records(Client("my-access-token", "1000"), config, "date", None, None)
+            next(pages)
+            assert mock_submit.call_count == 2
+            list(pages)
+        assert mock_submit.call_count == 6
+
+    def test_should_split_date_range_into_weeks(self):
+        assert split_date_range(date(2020, 1, 1), date(2020, 1, 16), "week") == [
+            (date(2020, 1, 1), date(2020, 1, 7)),
+            (date(2020, 1, 8), date(2020, 1, 14)),
+            (date(2020, 1, 15), date(2020, 1, 16)),
+        ]
+
+    def test_should_split_date_range_into_months_across_years(self):
+        assert split_date_range(date(2019, 12, 15), date(2020, 1, 1), "month") == [
+            (date(2019, 12, 15), date(2019, 12, 31)),
+            (date(2020, 1, 1), date(2020, 1, 1)),
+        ]
+
     def test_should_raise_error_when_start_date_greater_than_end_date(self, mock_catalog):
         config = {
             "access_token": "my-access-token",
@@ -160,18 +439,68 @@ class TestSyncRecords:
         assert requests_page0.call_count == 1
         assert requests_page1.call_count == 1
 
-    def test_should_raise_error_when_incremental_replication_requested(self, mock_catalog):
+    @pytest.mark.usefixtures("mock_json_backend")
+    def test_should_start_from_bookmark_less_lookback_given_incremental_replication(
+        self, mock_stdout, requests_mock, mock_catalog
+    ):
+        requests_page0 = requests_mock.get(
+            "https://api.nikabot.com/api/v1/records?limit=1000&page=0&dateStart=20200607&dateEnd=99991231",
+            json=json.loads(RECORDS_RESPONSE),
+        )
+        requests_mock.get(
+            "https://api.nikabot.com/api/v1/records?limit=1000&page=1&dateStart=20200607&dateEnd=99991231",
+            json=json.loads(EMPTY_RESPONSE),
+        )
+        config = {"access_token": "my-access-token", "page_size": 1000, "start_date": "2020-01-01", "lookback_days": 2}
+        state = {"records": "2020-06-09T00:00:00.000"}
+        mock_catalog.streams[0].replication_key = "date"
+        mock_catalog.streams[0].replication_method = "INCREMENTAL"
+
+        sync(config, state, mock_catalog)
+        assert requests_page0.call_count == 1
+        assert mock_stdout.mock_calls[-1] == call('{"type": "STATE", "value": {"records": "2020-06-10T00:00:00"}}\n')
+
+    def test_should_not_write_bookmark_given_full_table_replication(self, mock_stdout, requests_mock, mock_catalog):
+        url = "https://api.nikabot.com/api/v1/records?limit=1000&page={}&dateStart=00010101&dateEnd=99991231"
+        requests_mock.get(url.format(0), json=json.loads(RECORDS_RESPONSE))
+        requests_mock.get(url.format(1), json=json.loads(EMPTY_RESPONSE))
         config = {"access_token": "my-access-token", "page_size": 1000}
-        state = {}
-        mock_catalog.streams[0].replication_key = ("date",)
+        state = {"records": "2020-06-09T00:00:00.000"}
+        mock_catalog.streams[0].replication_key = "date"
+
+        sync(config, state, mock_catalog)
+        message_types = [json.loads(c.args[0])["type"] for c in mock_stdout.mock_calls]
+        assert message_types == ["SCHEMA", "RECORD", "RECORD"]
+
+    @pytest.mark.usefixtures("mock_json_backend")
+    def test_should_keep_bookmark_given_incremental_replication_and_no_new_records(
+        self, mock_stdout, requests_mock, mock_catalog
+    ):
+        requests_mock.get(
+            "https://api.nikabot.com/api/v1/records?limit=1000&page=0&dateStart=20200609&dateEnd=99991231",
+            json=json.loads(EMPTY_RESPONSE),
+        )
+        config = {"access_token": "my-access-token", "page_size": 1000}
+        state = {"records": "2020-06-09T00:00:00.000"}
+        mock_catalog.streams[0].replication_key = "date"
         mock_catalog.streams[0].replication_method = "INCREMENTAL"
 
-        with pytest.raises(InvalidReplicationMethodError) as excinfo:
-            sync(config, state, mock_catalog)
-            assert (
-                str(excinfo.value)
-                == "Invalid replication method selected 'INCREMENTAL', valid options are 'FULL_TABLE'"
-            )
+        sync(config, state, mock_catalog)
+        assert mock_stdout.mock_calls[-1] == call('{"type": "STATE", "value": {"records": "2020-06-09T00:00:00.000"}}\n')
+
+    @pytest.mark.usefixtures("mock_json_backend")
+    def test_should_compare_bookmarks_as_date_times_given_mixed_formats(self, mock_stdout, requests_mock, mock_catalog):
+        url = "https://api.nikabot.com/api/v1/records?limit=1000&page={}&dateStart=20200610&dateEnd=99991231"
+        requests_mock.get(url.format(0), json=json.loads(RECORDS_RESPONSE))
+        requests_mock.get(url.format(1), json=json.loads(EMPTY_RESPONSE))
+        config = {"access_token": "my-access-token", "page_size": 1000}
+        # Earlier than the last record's date, but greater as a string
+        state = {"records": "2020-06-10T00:00:00+10:00"}
+        mock_catalog.streams[0].replication_key = "date"
+        mock_catalog.streams[0].replication_method = "INCREMENTAL"
+
+        sync(config, state, mock_catalog)
+        assert mock_stdout.mock_calls[-1] == call('{"type": "STATE", "value": {"records": "2020-06-10T00:00:00"}}\n')
 
     def test_should_raise_error_when_log_based_replication_requested(self, mock_catalog):
         config = {"access_token": "my-access-token", "page_size": 1000}
@@ -181,5 +510,6 @@ class TestSyncRecords:
         with pytest.raises(InvalidReplicationMethodError) as excinfo:
             sync(config, state, mock_catalog)
             assert (
-                str(excinfo.value) == "Invalid replication method selected 'LOG_BASED', valid options are 'FULL_TABLE'"
+                str(excinfo.value)
+                == "Invalid replication method selected 'LOG_BASED', valid options are 'FULL_TABLE, INCREMENTAL'"
             )
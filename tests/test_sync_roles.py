@@ -3,6 +3,7 @@ import json
 import logging
 from unittest.mock import call
 
+import pytest
 from singer.catalog import Catalog, CatalogEntry
 from singer.schema import Schema
 
@@ -14,6 +15,7 @@ ROLES_RESPONSE = '{"ok":true,"result":[{"id":"d893ebf32d49c35c1d754774","team_id
 
 
 class TestSyncRoles:
+    @pytest.mark.usefixtures("mock_json_backend")
     def test_should_output_records(self, mock_stdout, requests_mock):
         requests_mock.get("https://api.nikabot.com/api/v1/roles?limit=1000&page=0", json=json.loads(ROLES_RESPONSE))
         requests_mock.get("https://api.nikabot.com/api/v1/roles?limit=1000&page=1", json=json.loads(EMPTY_RESPONSE))
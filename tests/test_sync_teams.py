@@ -3,6 +3,7 @@ import json
 import logging
 from unittest.mock import call
 
+import pytest
 from singer.catalog import Catalog, CatalogEntry
 from singer.schema import Schema
 
@@ -13,6 +14,7 @@ TEAMS_RESPONSE = '{"ok":true,"result":[{"id":"5d6ca50762a07c00045125fb","domain"
 
 
 class TestSyncTeams:
+    @pytest.mark.usefixtures("mock_json_backend")
     def test_should_output_records(self, mock_stdout, requests_mock):
         requests_mock.get("https://api.nikabot.com/api/v1/teams", json=json.loads(TEAMS_RESPONSE))
         config = {"access_token": "my-access-token", "page_size": 1000}
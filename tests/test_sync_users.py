@@ -39,6 +39,7 @@ class TestSyncUsers:
         mock_stdout.assert_not_called()
         assert LOGGER.info.mock_calls == [call("Skipping stream: %s", "users")]
 
+    @pytest.mark.usefixtures("mock_json_backend")
     def test_should_output_no_records_given_no_records_available(self, mock_stdout, requests_mock):
         requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=0", json=json.loads(EMPTY_RESPONSE))
         config = {"access_token": "my-access-token", "page_size": 1000}
@@ -68,6 +69,30 @@ class TestSyncUsers:
             ),
         ]
 
+    def test_should_output_same_messages_given_fastest_json_backend(self, mock_stdout, requests_mock):
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=0", json=json.loads(USERS_RESPONSE))
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=1", json=json.loads(EMPTY_RESPONSE))
+        config = {"access_token": "my-access-token", "page_size": 1000}
+        catalog = Catalog(
+            streams=[
+                CatalogEntry(
+                    tap_stream_id="users",
+                    stream="users",
+                    schema=Schema.from_dict({}),
+                    key_properties=["id"],
+                    metadata=[{"breadcrumb": [], "metadata": {"selected": True}}],
+                )
+            ]
+        )
+        with patch("tap_nikabot.jsonlib.orjson", None), patch("tap_nikabot.jsonlib.ujson", None):
+            sync(config, {}, catalog)
+        expected = [json.loads(c.args[0]) for c in mock_stdout.mock_calls]
+        mock_stdout.reset_mock()
+        sync(config, {}, catalog)
+        # The fastest backend formats messages differently, see jsonlib, so they're compared once parsed
+        assert [json.loads(c.args[0]) for c in mock_stdout.mock_calls] == expected
+
+    @pytest.mark.usefixtures("mock_json_backend")
     def test_should_output_records(self, mock_stdout, requests_mock):
         requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=0", json=json.loads(USERS_RESPONSE))
         requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=1", json=json.loads(EMPTY_RESPONSE))
@@ -109,3 +134,112 @@ class TestSyncUsers:
                 {"limit": "1000", "page": "1"},
             ),
         ]
+
+    def test_should_write_messages_in_one_chunk_given_output_buffer(self, mock_stdout, requests_mock):
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=0", json=json.loads(USERS_RESPONSE))
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=1", json=json.loads(EMPTY_RESPONSE))
+        config = {"access_token": "my-access-token", "page_size": 1000, "output_buffer_size": 1024 * 1024}
+        state = {}
+        catalog = Catalog(
+            streams=[
+                CatalogEntry(
+                    tap_stream_id="users",
+                    stream="users",
+                    schema=Schema.from_dict({}),
+                    key_properties=["id"],
+                    metadata=[{"breadcrumb": [], "metadata": {"selected": True}}],
+                )
+            ]
+        )
+        sync(config, state, catalog)
+        assert len(mock_stdout.mock_calls) == 1
+        lines = mock_stdout.mock_calls[0].args[0].splitlines()
+        assert [json.loads(line)["type"] for line in lines] == ["SCHEMA", "RECORD", "RECORD"]
+
+    def test_should_output_records_given_stream_pages(self, mock_stdout, requests_mock):
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=0", text=USERS_RESPONSE)
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=1", text=EMPTY_RESPONSE)
+        config = {"access_token": "my-access-token", "page_size": 1000, "stream_pages": True}
+        state = {}
+        catalog = Catalog(
+            streams=[
+                CatalogEntry(
+                    tap_stream_id="users",
+                    stream="users",
+                    schema=Schema.from_dict({}),
+                    key_properties=["id"],
+                    metadata=[{"breadcrumb": [], "metadata": {"selected": True}}],
+                )
+            ]
+        )
+        sync(config, state, catalog)
+        records = [json.loads(c.args[0])["record"] for c in mock_stdout.mock_calls[1:]]
+        assert records == json.loads(USERS_RESPONSE)["result"]
+
+    @pytest.mark.parametrize("transform_processes", [0, 1])
+    def test_should_output_changed_and_deleted_rows_given_change_detection(
+        self, mock_stdout, requests_mock, transform_processes
+    ):
+        users = json.loads(USERS_RESPONSE)["result"]
+        requests_mock.get(
+            "https://api.nikabot.com/api/v1/users?limit=1000&page=0",
+            [{"json": {"ok": True, "result": users}}, {"json": {"ok": True, "result": [dict(users[1], name="paul")]}}],
+        )
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=1", text=EMPTY_RESPONSE)
+        config = {
+            "access_token": "my-access-token",
+            "page_size": 1000,
+            "change_detection": True,
+            "transform_processes": transform_processes,
+        }
+        catalog = Catalog(
+            streams=[
+                CatalogEntry(
+                    tap_stream_id="users",
+                    stream="users",
+                    schema=Schema.from_dict({}),
+                    key_properties=["id"],
+                    metadata=[{"breadcrumb": [], "metadata": {"selected": True}}],
+                )
+            ]
+        )
+        sync(config, {}, catalog)
+        state = json.loads(mock_stdout.mock_calls[-1].args[0])["value"]
+        assert list(state["hashes"]["users"]) == [users[0]["id"], users[1]["id"]]
+
+        mock_stdout.reset_mock()
+        sync(config, state, catalog)
+        messages = [json.loads(c.args[0]) for c in mock_stdout.mock_calls]
+        assert [m["type"] for m in messages] == ["SCHEMA", "RECORD", "RECORD", "STATE"]
+        assert messages[1]["record"]["name"] == "paul"
+        assert messages[2]["record"] == {"id": users[0]["id"], "_sdc_deleted_at": "2020-01-01T00:00:00.000000Z"}
+
+        mock_stdout.reset_mock()
+        sync(config, messages[3]["value"], catalog)
+        assert [json.loads(c.args[0])["type"] for c in mock_stdout.mock_calls] == ["SCHEMA", "STATE"]
+
+    def test_should_keep_hashes_in_file_given_change_index_dir(self, mock_stdout, requests_mock, tmp_path):
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=0", text=USERS_RESPONSE)
+        requests_mock.get("https://api.nikabot.com/api/v1/users?limit=1000&page=1", text=EMPTY_RESPONSE)
+        config = {
+            "access_token": "my-access-token",
+            "page_size": 1000,
+            "change_detection": True,
+            "change_index_dir": str(tmp_path),
+        }
+        catalog = Catalog(
+            streams=[
+                CatalogEntry(
+                    tap_stream_id="users",
+                    stream="users",
+                    schema=Schema.from_dict({}),
+                    key_properties=["id"],
+                    metadata=[{"breadcrumb": [], "metadata": {"selected": True}}],
+                )
+            ]
+        )
+        sync(config, {}, catalog)
+        assert len(json.loads((tmp_path / "users.json").read_text())) == 2
+        mock_stdout.reset_mock()
+        sync(config, {}, catalog)
+        assert [json.loads(c.args[0])["type"] for c in mock_stdout.mock_calls] == ["SCHEMA"]
@@ -0,0 +1,117 @@
+# pylint: disable=no-self-use
+import copy
+import sys
+
+import pytest
+from singer import Transformer
+from singer.transform import SchemaMismatch
+
+from tap_nikabot.transform import RecordTransformer
+
+RECORD_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "created_at": {"type": "string", "format": "date-time"},
+        "date": {"type": "string", "format": "date-time"},
+        "edited": {
+            "type": "object",
+            "properties": {"author": {"type": "string"}, "date": {"type": "string", "format": "date-time"}},
+        },
+        "hours": {"type": "number", "format": "double"},
+        "id": {"type": "string"},
+        "groups": {"type": "array", "items": {"type": "string"}},
+        "tz_offset": {"type": "integer", "format": "int32"},
+        "deleted": {"type": "boolean"},
+        "archived": {"$ref": "#/definitions/Archived"},
+        "info": {"type": ["null", "string"]},
+        "is_admin": {"type": ["null", "boolean"]},
+    },
+}
+RECORD = {
+    "id": "5ee2ca823e056d00141896a0",
+    "hours": 2.0,
+    "date": "2000-01-01T00:00:00",
+    "created_at": "2020-01-01T00:21:22.779",
+    "edited": {"author": "UBM1DQ9RB", "date": "2019-08-20T00:00:00Z"},
+    "groups": ["a", "b"],
+    "tz_offset": 36000,
+    "deleted": False,
+    "archived": {"date": "2020-01-01T00:00:00"},
+    "info": None,
+}
+
+
+def transform_both(record, schema=None, metadata_map=None):
+    schema = schema if schema is not None else RECORD_SCHEMA
+    metadata_map = metadata_map or {}
+    with Transformer() as transformer:
+        expected = transformer.transform(copy.deepcopy(record), copy.deepcopy(schema), metadata_map)
+    with RecordTransformer(copy.deepcopy(schema), metadata_map) as transformer:
+        actual = transformer.transform_record(copy.deepcopy(record))
+    return expected, actual
+
+
+class TestRecordTransformer:
+    @pytest.mark.parametrize(
+        "changes",
+        [
+            {},
+            {"hours": 7},
+            {"hours": "7.5"},
+            {"tz_offset": "1,000"},
+            {"deleted": "false"},
+            {"id": 12},
+            {"date": "2020-06-10T00:00:00.1234"},
+            {"date": "2020-06-10T10:00:00+10:00"},
+            {"date": "2020-06-10"},
+            {"date": "0999-06-10T00:00:00"},
+            {"info": "notes"},
+            {"is_admin": None},
+            {"unknown": "field"},
+            {"edited": {"author": "U1", "unknown": 1}},
+        ],
+    )
+    def test_should_match_generic_transformer(self, changes):
+        expected, actual = transform_both({**RECORD, **changes})
+        assert actual == expected
+        assert list(actual) == list(expected)
+
+    def test_should_match_generic_transformer_given_empty_schema(self):
+        expected, actual = transform_both(RECORD, schema={})
+        assert actual == expected
+
+    def test_should_filter_fields_not_selected(self):
+        metadata_map = {(): {"selected": True}, ("properties", "hours"): {"selected": False}}
+        expected, actual = transform_both(RECORD, metadata_map=metadata_map)
+        assert "hours" not in actual
+        assert actual == expected
+
+    @pytest.mark.parametrize(
+        "record, metadata_map",
+        [
+            (RECORD, {(): {"selected": True}, ("properties", "hours"): {"selected": False}}),
+            (RECORD, {(): {"selected": True}, ("properties", "groups"): {"inclusion": "unsupported"}}),
+            ({**RECORD, "unknown": 1, "edited": {"author": "U1", "other": 2}}, {}),
+        ],
+    )
+    def test_should_track_filtered_and_removed_fields_as_generic_transformer(self, record, metadata_map):
+        with Transformer() as expected:
+            expected.transform(copy.deepcopy(record), copy.deepcopy(RECORD_SCHEMA), metadata_map)
+        with RecordTransformer(copy.deepcopy(RECORD_SCHEMA), metadata_map) as actual:
+            actual.transform_record(copy.deepcopy(record))
+        assert actual.filtered == expected.filtered
+        assert actual.removed == expected.removed
+
+    def test_should_raise_schema_mismatch_given_number_too_large_for_float(self):
+        with RecordTransformer(RECORD_SCHEMA, {}) as transformer:
+            with pytest.raises(SchemaMismatch):
+                transformer.transform_record({**RECORD, "hours": int(sys.float_info.max) * 10})
+
+    def test_should_raise_schema_mismatch_given_invalid_date(self):
+        with RecordTransformer(RECORD_SCHEMA, {}) as transformer:
+            with pytest.raises(SchemaMismatch):
+                transformer.transform_record({**RECORD, "date": "2020-02-30T00:00:00"})
+
+    def test_should_compile_supported_schema(self):
+        transformer = RecordTransformer(RECORD_SCHEMA, {})
+        assert transformer.converter is not None